@@ -1,9 +1,20 @@
-import math
+"""Converts coordinates between WGS84 and ISN93.
 
+Usage:
+    > python coordinate_conversion.py input.csv output.csv
+
+    converts the lon and lat columns of input.csv to x and y, streaming
+    the file in chunks, see convert_csv(). The other direction is
+
+    > python coordinate_conversion.py input.csv output.csv --direction=isn_to_wgs
+"""
+
+import os
+
+import fire
 import json
 import numpy as np
-from scipy.optimize import fsolve
-
+import pandas as pd
 
 class Conversion:
     """Converts between WGS84 and ISN93.
@@ -15,12 +26,17 @@ class Conversion:
     Equations adapted from Kristjan Mikaelsson's JS-code:
     https://bit.ly/32rqbFE
 
+    Both directions take scalars or NumPy arrays of any (broadcastable)
+    shape, so whole trajectories or registries convert in one call.
+
     Example:
         conversion_ = Conversion()
         lon, lat = -22.69113, 63.82388
         x, y = conversion_.wgs_to_isn(lon, lat)
     """
 
+    NEWTON_ITERATIONS = 6
+
     def __init__(self):
         with open("config.json") as f:
             settings = json.load(f)
@@ -44,24 +60,24 @@ class Conversion:
         https://i.imgur.com/UH42pDb.png
 
         Args:
-            lon: longitude
-            lat: latitude
-        
+            lon (float or np.array): longitude
+            lat (float or np.array): latitude
+
         Returns:
-            x (float): horizontal ISN93 coordinate
-            y (float): vertical ISN93 coordinate
+            x (float or np.array): horizontal ISN93 coordinate
+            y (float or np.array): vertical ISN93 coordinate
         """
 
-        k = lat * self.A
+        k = np.asarray(lat, dtype=float) * self.A
         p = self.F * np.sin(k)
-        o = self.B * math.pow(
-            math.tan(self.C - (k / 2)) / math.pow((1 - p) / (1 + p), self.E), self.G
+        o = self.B * np.power(
+            np.tan(self.C - (k / 2)) / np.power((1 - p) / (1 + p), self.E), self.G
         )
-        q = (lon + 19) * self.H
+        q = (np.asarray(lon, dtype=float) + 19) * self.H
         x = self.K + o * np.sin(q)
         y = self.J - o * np.cos(q)
 
-        return round(x, 1), round(y, 1)
+        return np.round(x, 1), np.round(y, 1)
 
     def isn_to_wgs(self, x: float, y: float):
         """Converts ISN93 value pairs to WGS84 (the familiar lat & lon).
@@ -70,45 +86,119 @@ class Conversion:
         it is truly an eyesore. See it here in a cleaner format:
         https://i.imgur.com/UH42pDb.png
 
+        The latitude equation has no closed form. It is solved in log
+        form, g(k) = 0, which is smooth and nearly linear in k over Iceland,
+        with a fixed number of Newton steps for all points at once.
+
         Args:
-            x: horizontal ISN93 coordinate
-            y: vertical ISN93 coordinate
-        
+            x (float or np.array): horizontal ISN93 coordinate
+            y (float or np.array): vertical ISN93 coordinate
+
         Returns:
-            lon (float): WGS84 longitude
-            lat (float): WGS84 latitude
+            lon (float or np.array): WGS84 longitude
+            lat (float or np.array): WGS84 latitude
         """
 
         DECIMALS = 5
 
-        def _f(k):
-            """The empirical equation for latitude.
-
-            Is solved numerically.
-            Note that it's written here as f(k)=0
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        q = np.arctan((x - self.K) / (self.J - y))
+        # Distance from the projection's apex, i.e. (x - K) / sin(q)
+        p = np.hypot(x - self.K, self.J - y)
+        log_p = np.log(p / self.B) / (self.E * self.G)
 
-            Args:
-                k ([type]): The variable to optimize
+        def g(k):
+            """The empirical equation for latitude, as g(k) = 0."""
 
-            Returns:
-                [type]: [description]
-            """            
+            s = self.F * np.sin(k)
             return (
-                (1.0 + self.F * np.sin(k))
-                * (np.tan(self.C - 0.5 * k)) ** (1.0 / self.E)
-                / (
-                    (1.0 - self.F * np.sin(k))
-                    * (p / self.B) ** (1.0 / (self.E * self.G))
-                )
-                - 1
+                np.log((1.0 + s) / (1.0 - s))
+                + np.log(np.tan(self.C - 0.5 * k)) / self.E
+                - log_p
             )
 
-        q = np.arctan((x - 5 * 10 ** 5) / (self.J - y))
-        p = (x - 5 * 10 ** 5) / (np.sin(q))
+        def dg(k):
+            s = self.F * np.sin(k)
+            return 2.0 * self.F * np.cos(k) / (1.0 - s**2) - 1.0 / (self.E * np.cos(k))
 
-        r = float(fsolve(_f, 1.0))
+        r = np.ones(np.broadcast(x, y).shape)
+        for _ in range(self.NEWTON_ITERATIONS):
+            r = r - g(r) / dg(r)
 
         lon = q / self.H - 19
         lat = r / self.A
 
-        return round(lon, DECIMALS), round(lat, DECIMALS)
\ No newline at end of file
+        return np.round(lon, DECIMALS), np.round(lat, DECIMALS)
+
+
+DIRECTIONS = {
+    "wgs_to_isn": (("lon", "lat"), ("x", "y")),
+    "isn_to_wgs": (("x", "y"), ("lon", "lat")),
+}
+
+
+def convert_csv(
+    input_filename: str,
+    output_filename: str,
+    direction: str = "wgs_to_isn",
+    columns: tuple = None,
+    output_columns: tuple = None,
+    chunksize: int = 100_000,
+):
+    """Converts the coordinates of a CSV file, chunk by chunk.
+
+    Only chunksize rows are in memory at a time, so files of any size
+    convert in constant memory. Every chunk is converted with array math
+    and appended to the output, with the converted columns added after
+    the original ones. The output is written to a temporary file first,
+    so a failed run leaves no partial file behind.
+
+    Args:
+        input_filename (str): CSV file to convert
+        output_filename (str): Converted CSV file
+        direction (str, optional): "wgs_to_isn" or "isn_to_wgs".
+            Defaults to "wgs_to_isn"
+        columns (tuple, optional): Names of the columns to convert.
+            Defaults to (lon, lat) or (x, y) depending on direction
+        output_columns (tuple, optional): Names of the converted columns.
+            Defaults to (x, y) or (lon, lat) depending on direction
+        chunksize (int, optional): Rows per chunk. Defaults to 100 000
+
+    Returns:
+        rows (int): Number of rows converted
+    """
+
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {list(DIRECTIONS)}")
+    default_columns, default_output_columns = DIRECTIONS[direction]
+    columns = tuple(columns or default_columns)
+    output_columns = tuple(output_columns or default_output_columns)
+    convert = getattr(Conversion(), direction)
+
+    tmp_filename = f"{output_filename}.tmp"
+    rows = 0
+    try:
+        for chunk in pd.read_csv(input_filename, chunksize=chunksize):
+            converted = convert(
+                chunk[columns[0]].to_numpy(dtype=float),
+                chunk[columns[1]].to_numpy(dtype=float),
+            )
+            for column, values in zip(output_columns, converted):
+                chunk[column] = values
+            chunk.to_csv(
+                tmp_filename, mode="a" if rows else "w", header=not rows, index=False
+            )
+            rows += len(chunk)
+            print(f"Conversion: {rows} rows")
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    os.replace(tmp_filename, output_filename)
+
+    return rows
+
+
+if __name__ == "__main__":
+    fire.Fire(convert_csv)
@@ -0,0 +1,279 @@
+import json
+import numpy as np
+import pandas as pd
+
+from geofeatures.surveys import WellSurveyStore, as_surveys
+
+with open("config.json") as f:
+    settings = json.load(f)
+
+
+def _dot(a, b):
+    return np.einsum("ij,ij->i", a, b)
+
+
+def closest_points_on_segments(p0, p1, q0, q1):
+    """Closest points between pairs of 3D line segments.
+
+    Vectorized version of the clamped closest-point algorithm
+    (Ericson, Real-Time Collision Detection, ch. 5.1.9). Handles
+    degenerate (zero-length) segments as points.
+
+    Args:
+        p0, p1 (np.array): (n, 3) start and end points of the first segments
+        q0, q1 (np.array): (n, 3) start and end points of the second segments
+
+    Returns:
+        distance (np.array): (n,) minimum distance between each pair
+        closest_p (np.array): (n, 3) closest point on the first segments
+        closest_q (np.array): (n, 3) closest point on the second segments
+    """
+
+    d1 = p1 - p0
+    d2 = q1 - q0
+    r = p0 - q0
+    a = _dot(d1, d1)
+    e = _dot(d2, d2)
+    b = _dot(d1, d2)
+    c = _dot(d1, r)
+    f = _dot(d2, r)
+
+    eps = 1e-12
+    safe_a = np.where(a > eps, a, 1.0)
+    safe_e = np.where(e > eps, e, 1.0)
+    denom = a * e - b * b
+    safe_denom = np.where(denom > eps, denom, 1.0)
+
+    # Parallel segments (denom = 0) start from s = 0
+    s = np.where(denom > eps, np.clip((b * f - c * e) / safe_denom, 0, 1), 0.0)
+    t = (b * s + f) / safe_e
+    # Clamp t and recompute s for the clamped t
+    s = np.where(t < 0, np.clip(-c / safe_a, 0, 1), s)
+    s = np.where(t > 1, np.clip((b - c) / safe_a, 0, 1), s)
+    t = np.clip(t, 0, 1)
+
+    # Degenerate segments
+    s = np.where(a <= eps, 0.0, s)
+    t = np.where(a <= eps, np.clip(f / safe_e, 0, 1), t)
+    s = np.where((e <= eps) & (a > eps), np.clip(-c / safe_a, 0, 1), s)
+    t = np.where(e <= eps, 0.0, t)
+
+    closest_p = p0 + s[:, None] * d1
+    closest_q = q0 + t[:, None] * d2
+    distance = np.linalg.norm(closest_p - closest_q, axis=-1)
+
+    return distance, closest_p, closest_q
+
+
+class SegmentBVH:
+    """A bounding-volume hierarchy of axis-aligned boxes over 3D segments.
+
+    The tree is stored as flat arrays. Nodes are split at the median
+    segment along the longest axis of their box until at most LEAF_SIZE
+    segments remain. Queries walk the tree breadth-first for all query
+    boxes at once, so each tree level costs a handful of array operations.
+
+    Attributes:
+        segments (np.array): (S, 2, 3) start and end points of the segments
+    """
+
+    LEAF_SIZE = 8
+
+    def __init__(self, segments: np.array):
+        self.segments = segments
+        seg_lo = segments.min(axis=1)
+        seg_hi = segments.max(axis=1)
+        centroids = segments.mean(axis=1)
+
+        self.order = np.arange(len(segments))
+        lo, hi, start, count, left, right = [], [], [], [], [], []
+
+        def add_node(begin, end):
+            members = self.order[begin:end]
+            lo.append(seg_lo[members].min(axis=0))
+            hi.append(seg_hi[members].max(axis=0))
+            start.append(begin)
+            count.append(end - begin)
+            left.append(-1)
+            right.append(-1)
+            return len(lo) - 1
+
+        stack = [add_node(0, len(segments))] if len(segments) else []
+        while stack:
+            node = stack.pop()
+            begin, n = start[node], count[node]
+            if n <= self.LEAF_SIZE:
+                continue
+            members = self.order[begin : begin + n]
+            axis = np.argmax(hi[node] - lo[node])
+            half = n // 2
+            partition = np.argpartition(centroids[members, axis], half)
+            self.order[begin : begin + n] = members[partition]
+            left[node] = add_node(begin, begin + half)
+            right[node] = add_node(begin + half, begin + n)
+            stack.extend((left[node], right[node]))
+
+        self.lo = np.array(lo).reshape(-1, 3)
+        self.hi = np.array(hi).reshape(-1, 3)
+        self.start = np.array(start, dtype=int)
+        self.count = np.array(count, dtype=int)
+        self.left = np.array(left, dtype=int)
+        self.right = np.array(right, dtype=int)
+
+    def query(self, query_lo: np.array, query_hi: np.array, radius: float):
+        """Finds segments whose boxes are within radius of the query boxes.
+
+        Args:
+            query_lo (np.array): (Q, 3) lower corners of the query boxes
+            query_hi (np.array): (Q, 3) upper corners of the query boxes
+            radius (float): Search distance between boxes
+
+        Returns:
+            query_index (np.array): (P,) index of the query box of each pair
+            segment_index (np.array): (P,) index of the segment of each pair
+        """
+
+        query_index = np.arange(len(query_lo) if len(self.lo) else 0)
+        node = np.zeros_like(query_index)
+        found_query, found_node = [query_index[:0]], [node[:0]]
+        while len(node):
+            gap = np.maximum(
+                0,
+                np.maximum(
+                    self.lo[node] - query_hi[query_index],
+                    query_lo[query_index] - self.hi[node],
+                ),
+            )
+            is_near = np.linalg.norm(gap, axis=-1) <= radius
+            query_index, node = query_index[is_near], node[is_near]
+
+            is_leaf = self.left[node] < 0
+            found_query.append(query_index[is_leaf])
+            found_node.append(node[is_leaf])
+
+            query_index = np.repeat(query_index[~is_leaf], 2)
+            node = np.stack(
+                (self.left[node[~is_leaf]], self.right[node[~is_leaf]]), axis=-1
+            ).ravel()
+
+        leaf_query = np.concatenate(found_query)
+        leaf_node = np.concatenate(found_node)
+        # Expand every (query, leaf) pair into its (query, segment) pairs
+        counts = self.count[leaf_node]
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        positions = np.repeat(self.start[leaf_node], counts) + offsets
+
+        return np.repeat(leaf_query, counts), self.order[positions]
+
+
+class ClosestApproach:
+    """Minimum 3D distance between a proposed well and incumbent wells.
+
+    Unlike Distance, which measures horizontal distance at equal depth,
+    this treats every well as a 3D polyline and finds the true closest
+    approach, which matters for deviated incumbents. Candidate segment
+    pairs are found with a SegmentBVH over the incumbent segments
+    instead of checking every pair.
+
+    Attributes:
+        polylines (dict): Well name as key, (K, 3) array of x, y and z
+            station coordinates as value
+    """
+
+    def __init__(self, polylines: dict):
+        self.well_names = np.array(list(polylines.keys()), dtype=object)
+        segments, well_of_segment = [np.empty((0, 2, 3))], [np.empty(0, dtype=int)]
+        for j, stations in enumerate(polylines.values()):
+            stations = np.asarray(stations, dtype=float)
+            segments.append(np.stack((stations[:-1], stations[1:]), axis=1))
+            well_of_segment.append(np.full(len(stations) - 1, j))
+        self.segments = np.concatenate(segments).reshape(-1, 2, 3)
+        self.well_of_segment = np.concatenate(well_of_segment).astype(int)
+        self.bvh = SegmentBVH(self.segments)
+
+    @classmethod
+    def from_surveys(cls, surveys: WellSurveyStore):
+        """Polylines of the wells in a WellSurveyStore.
+
+        Raises:
+            ValueError: If two wells have the same name
+        """
+
+        names, counts = np.unique(surveys.names, return_counts=True)
+        if (counts > 1).any():
+            raise ValueError(f"Duplicate well names: {sorted(names[counts > 1])}")
+
+        return cls(dict(zip(surveys.names, surveys)))
+
+    @classmethod
+    def from_wells(cls, incumbent_wells: pd.DataFrame):
+        """Polylines of the (vertical) incumbent wells in wells.csv format."""
+
+        return cls.from_surveys(as_surveys(incumbent_wells))
+
+    def run(self, proposed_well: np.array, max_distance: float = None, wells=None):
+        """Finds the closest approach of every nearby incumbent well.
+
+        Args:
+            proposed_well (np.array): (M, 3) coordinates of the proposed well
+            max_distance (float, optional): Wells further away than this are
+                left out. Defaults to max_distance in config.json
+            wells (np.array, optional): Positions of the incumbent wells to
+                measure, the segments of the rest are dropped before any
+                distance is calculated. Defaults to all
+
+        Returns:
+            (pd.DataFrame): Indexed by well name, sorted by distance. Columns
+                are the distance and the closest points on the proposed
+                (x, y, z) and incumbent (x_incumbent, ...) wells
+        """
+
+        if max_distance is None:
+            max_distance = settings["max_distance"]
+
+        p0, p1 = proposed_well[:-1], proposed_well[1:]
+        query_lo = np.minimum(p0, p1)
+        query_hi = np.maximum(p0, p1)
+        proposed_index, segment_index = self.bvh.query(query_lo, query_hi, max_distance)
+        if wells is not None:
+            is_measured = np.isin(self.well_of_segment[segment_index], wells)
+            proposed_index = proposed_index[is_measured]
+            segment_index = segment_index[is_measured]
+
+        q0 = self.segments[segment_index, 0]
+        q1 = self.segments[segment_index, 1]
+        distance, closest_p, closest_q = closest_points_on_segments(
+            p0[proposed_index], p1[proposed_index], q0, q1
+        )
+        is_near = distance <= max_distance
+        well = self.well_of_segment[segment_index][is_near]
+        distance = distance[is_near]
+
+        # Minimum distance per well, first of each well after sorting
+        order = np.lexsort((distance, well))
+        is_first = np.r_[True, np.diff(well[order]) != 0] if len(order) else order
+        closest = order[is_first]
+
+        approaches = pd.DataFrame(
+            np.column_stack(
+                (
+                    distance[closest],
+                    closest_p[is_near][closest],
+                    closest_q[is_near][closest],
+                )
+            ).reshape(-1, 7),
+            index=pd.Index(self.well_names[well[closest]], name="Borholunofn"),
+            columns=[
+                "distance",
+                "x",
+                "y",
+                "z",
+                "x_incumbent",
+                "y_incumbent",
+                "z_incumbent",
+            ],
+        )
+
+        return approaches.sort_values("distance")
@@ -0,0 +1,191 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+from geofeatures.anticollision import ClosestApproach
+from geofeatures.spatial import WellIndex
+from geofeatures.surveys import as_surveys
+
+with open("config.json") as f:
+    settings = json.load(f)
+
+# The surveys and their ClosestApproach, built once per worker process
+_worker = dict()
+
+
+def _init_worker(surveys, max_distance: float):
+    _worker["surveys"] = surveys
+    _worker["approach"] = ClosestApproach.from_surveys(surveys)
+    _worker["max_distance"] = max_distance
+
+
+def clearance_of(task):
+    """Closest approach of some wells to their candidate neighbours.
+
+    Only the segments of the candidates are measured, so each pair is
+    measured once, from the well with the lower position.
+
+    Args:
+        task (list): (j, ks) pairs, ks being the positions (all > j) of
+            the wells that may come within max_distance of well j
+
+    Returns:
+        rows, columns (np.array): Positions of the wells of each pair
+        distances (np.array): Minimum 3D distance of each pair
+        row_depths, column_depths (np.array): Depth of the closest points
+            on the row and column wells
+    """
+
+    surveys = _worker["surveys"]
+    results = [[] for _ in range(5)]
+    for j, ks in task:
+        approaches = _worker["approach"].run(
+            surveys.well(j), _worker["max_distance"], wells=ks
+        )
+        partners = np.array(
+            [surveys.index_of(name) for name in approaches.index], dtype=int
+        )
+        for result, values in zip(
+            results,
+            (
+                np.full(len(partners), j),
+                partners,
+                approaches["distance"].to_numpy(),
+                approaches["z"].to_numpy(),
+                approaches["z_incumbent"].to_numpy(),
+            ),
+        ):
+            result.append(values)
+
+    return tuple(np.concatenate(result + [np.empty(0)]) for result in results)
+
+
+class FieldClearance:
+    """Minimum clearance between every pair of incumbent wells in a field.
+
+    Pairs are pruned with a WellIndex, so only wells whose stations come
+    within max_distance of each other (horizontally) are measured. Each
+    remaining pair is measured once, as the true 3D closest approach of
+    the two well paths, see ClosestApproach, spread across a process pool.
+
+    The result is two sparse (n_wells, n_wells) matrices. distance[j, k]
+    is the minimum distance between wells j and k, and depth[j, k] the
+    depth on well j where it's closest to well k. Pairs further apart
+    than max_distance have no entry. Wells that touch, e.g. share a
+    wellhead, have an explicit entry of 0, so tell pairs apart by the
+    sparsity structure (see pairs()), not by value.
+
+    Attributes:
+        incumbent_wells: Incumbent wells, see Distance
+        max_distance (float, optional): Pruning distance.
+            Defaults to max_distance in config.json
+        max_workers (int, optional): Size of the process pool. Defaults to
+            the number of cores. With 1, pairs are measured in-process
+    """
+
+    def __init__(self, incumbent_wells, max_distance: float = None, max_workers=None):
+        self.surveys = as_surveys(incumbent_wells)
+        if max_distance is None:
+            max_distance = settings["max_distance"]
+        self.max_distance = max_distance
+        self.max_workers = max_workers or os.cpu_count()
+        self.distance = None
+        self.depth = None
+
+    def candidate_pairs(self):
+        """Candidate neighbours of each well, each pair listed once.
+
+        Returns:
+            (list): (j, ks) for every well j with candidates, ks > j
+        """
+
+        index = WellIndex(self.surveys)
+        pairs = []
+        for j in range(len(self.surveys)):
+            # Both wells may be up to half a segment away from a station
+            ks = index.candidates(self.surveys.well(j), self.max_distance + index.slack)
+            ks = ks[ks > j]
+            if len(ks):
+                pairs.append((j, ks))
+
+        return pairs
+
+    def run(self, chunk_size: int = 50):
+        """High-level method for the clearance matrix.
+
+        Args:
+            chunk_size (int, optional): Wells per task. Defaults to 50
+
+        Returns:
+            distance, depth (scipy.sparse.csr_matrix): See FieldClearance
+        """
+
+        pairs = self.candidate_pairs()
+        tasks = [
+            pairs[start : start + chunk_size]
+            for start in range(0, len(pairs), chunk_size)
+        ]
+        if self.max_workers == 1:
+            _init_worker(self.surveys, self.max_distance)
+            results = list(map(clearance_of, tasks))
+        else:
+            with ProcessPoolExecutor(
+                self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.surveys, self.max_distance),
+            ) as pool:
+                results = list(pool.map(clearance_of, tasks))
+
+        rows, columns, distances, row_depths, column_depths = (
+            np.concatenate([result[n] for result in results] + [np.empty(0)])
+            for n in range(5)
+        )
+        both_rows = np.concatenate((rows, columns)).astype(int)
+        both_columns = np.concatenate((columns, rows)).astype(int)
+        shape = (len(self.surveys),) * 2
+        self.distance = scipy.sparse.csr_matrix(
+            (np.concatenate((distances, distances)), (both_rows, both_columns)), shape
+        )
+        self.depth = scipy.sparse.csr_matrix(
+            (np.concatenate((row_depths, column_depths)), (both_rows, both_columns)),
+            shape,
+        )
+
+        return self.distance, self.depth
+
+    def pairs(self):
+        """The measured pairs of run(), each listed once.
+
+        Returns:
+            (pd.DataFrame): Well names, distance and the depths of the
+                closest points on both wells, one row per pair with j < k
+        """
+
+        distance = self.distance.tocoo()
+        # Both matrices have the same (symmetric) sparsity structure, so
+        # their entries line up in canonical order
+        depth = self.depth.tocoo()
+        other_depth = self.depth.T.tocsr().tocoo()
+        is_upper = distance.row < distance.col
+
+        return pd.DataFrame(
+            dict(
+                well=self.surveys.names[distance.row[is_upper]],
+                other=self.surveys.names[distance.col[is_upper]],
+                distance=distance.data[is_upper],
+                depth=depth.data[is_upper],
+                other_depth=other_depth.data[is_upper],
+            )
+        )
+
+    def save(self, directory: str):
+        """Writes distance.npz, depth.npz and the well names to directory."""
+
+        os.makedirs(directory, exist_ok=True)
+        scipy.sparse.save_npz(os.path.join(directory, "distance.npz"), self.distance)
+        scipy.sparse.save_npz(os.path.join(directory, "depth.npz"), self.depth)
+        np.save(os.path.join(directory, "names.npy"), np.asarray(self.surveys.names))
@@ -1,28 +1,71 @@
 import json
 import numpy as np
 
+from geofeatures.surveys import as_surveys
 
 with open("config.json") as f:
     settings = json.load(f)
 
 
-def interpolate(a: list, b: list):
-    """General linear table interpolation.
+def interpolate_rows(z_query, z_stations, values):
+    """Linear interpolation of many wells at once, like np.interp per row.
+
+    All rows are searched in a single np.searchsorted call by shifting
+    each row (and its queries) into its own disjoint depth interval.
 
     Args:
-        a (list): Shape 1x3 
-        b (list): Shape 1x2. Interpolating for the value between b[0] and b[1]
-    
+        z_query (np.array): (M,) depths to interpolate at
+        z_stations (np.array): (n, K) station depths, non-decreasing per row
+        values (np.array): (n, K) or (n, K, d) values at the stations
+
     Returns:
-        interpolated value
+        (np.array): (n, M) or (n, M, d) interpolated values,
+            NaN where z_query is outside a row's depth range
     """
-    return b[0] + (b[1] - b[0]) * (a[1] - a[0]) / (a[2] - a[0])
 
+    n, K = z_stations.shape
+    if n == 0:
+        return np.empty((0, len(z_query)) + values.shape[2:])
+    rows = np.arange(n)[:, None]
+    shift = np.ptp(z_stations) + np.ptp(z_query) + 1.0
+    shifted_stations = (z_stations - z_stations.min() + rows * shift).ravel()
+    shifted_query = (z_query - z_stations.min() + rows * shift).ravel()
+    flat_index = np.searchsorted(shifted_stations, shifted_query, side="right")
+
+    # Bracketing station indices within each row
+    upper = np.clip(flat_index.reshape(n, -1) - rows * K, 1, K - 1)
+    lower = upper - 1
+    z_lower = np.take_along_axis(z_stations, lower, axis=1)
+    z_upper = np.take_along_axis(z_stations, upper, axis=1)
+    dz = z_upper - z_lower
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(dz > 0, (z_query - z_lower) / dz, 0.0)
+
+    is_overlapping = (z_query >= z_stations[:, :1]) & (z_query <= z_stations[:, -1:])
+    if values.ndim == 3:
+        t = t[..., None]
+        is_overlapping = is_overlapping[..., None]
+        lower = lower[..., None]
+        upper = upper[..., None]
+    value_lower = np.take_along_axis(values, lower, axis=1)
+    value_upper = np.take_along_axis(values, upper, axis=1)
+    interpolated = value_lower + t * (value_upper - value_lower)
 
-def generate_zs_for_incumbent_vertical_wells(well_depth, len_of_proposed_well):
-    return np.linspace(
-        settings["default_values"]["Z"], well_depth, len_of_proposed_well
-    )
+    return np.where(is_overlapping, interpolated, np.nan)
+
+
+def incumbent_stations(incumbent_wells):
+    """Station coordinates of the incumbent wells.
+
+    Args:
+        incumbent_wells: Incumbent wells, see Distance
+
+    Returns:
+        xy (np.array): (n_wells, K, 2) x and y coordinates
+        z (np.array): (n_wells, K) depths
+    """
+
+    return as_surveys(incumbent_wells).padded()
 
 
 # TODO: Change incumbent wells from vertical (open-source) to closed-source
@@ -31,105 +74,203 @@ class Distance:
     """Calculates distance of proposed well to nearest incumbent wells.
 
     Incumbent wells and proposed well don't usually have same z-linspaces.
-    This solves that by creating new x and y values for incumbents
+    This solves that by interpolating x and y values for incumbents
     at depths corresponding to the proposed well to be able to calculate
-    the horizontal distance between wells.
-    
+    the horizontal distance between wells. All incumbents and depths
+    are handled at once with array operations.
+
+    After run(), update() recalculates only the stations of a new
+    proposed well that moved, e.g. when only the last leg changes.
+
     Attributes:
-        incumbent_wells: A dict of 3D coordinates of all incumbent wells.
-            The format is well name as key, with x, y, and z coordinates
-            as nested keys
-        proposed_well: An array of the 3D coordinates of the proposed well
+        incumbent_wells: A pd.DataFrame of (vertical) incumbent wells, with
+            well name (Borholunofn), wellhead x and y, and well depth
+            (MaxFDypi), or a surveys.WellSurveyStore of deviated wells
+        proposed_well: An (M, 3) array of the 3D coordinates
+            of the proposed well
+        index (optional): A spatial.WellIndex over incumbent_wells. If given,
+            only wells within max_distance of the proposed well are
+            calculated, the rest are left as NaN. Defaults to None.
+        max_distance (float, optional): Pruning distance for index.
+            Defaults to max_distance in config.json
     """
 
-    def __init__(self, incumbent_wells, proposed_well):
+    # Padded incumbent stations interpolated at once, see _blocks()
+    BLOCK_STATIONS = 1_000_000
+
+    def __init__(self, incumbent_wells, proposed_well, index=None, max_distance=None):
         self.incumbent_wells = incumbent_wells
         self.proposed_well = proposed_well
+        self.index = index
+        if max_distance is None:
+            max_distance = settings["max_distance"]
+        self.max_distance = max_distance
+        self.distances = None
+        self._surveys = None
 
-    def _synthesize_values(self, index_proposed: int, value_to_interpolate: list):
-        """Creates X & Y values at equal depths for proposed and incumbent wells.
+    def _horizontal_distances(self, xy, z, stations=slice(None)):
+        proposed_well = self.proposed_well[stations]
+        xy_interp = interpolate_rows(proposed_well[:, 2], z, xy)
+        delta = xy_interp - proposed_well[None, :, :2]
 
-        Args:
-            i_reference (int): The proposed well depth index
-            value_to_interpolate (list): 1x2
+        return np.hypot(delta[..., 0], delta[..., 1])
+
+    def _candidates(self):
+        """Rows of incumbent_wells to calculate, all of them without an index.
 
         Returns:
-            interpolated_value (float): The interpolated value
+            (np.array): (n_wells,) boolean mask
         """
 
-        interpolated_value = interpolate(
-            a=self.proposed_well[index_proposed - 1 : index_proposed + 2, -1],
-            b=value_to_interpolate,
-        )
+        is_candidate = np.zeros(len(self.incumbent_wells), dtype=bool)
+        if self.index is None:
+            is_candidate[:] = True
+        else:
+            is_candidate[
+                self.index.candidates(self.proposed_well, self.max_distance)
+            ] = True
 
-        return interpolated_value
+        return is_candidate
 
-    def _calculate_distance(
-        self, x_interp: float, y_interp: float, index_proposed: int
-    ):
-        """Calculates the distance between two points on a 2D surface.
+    def surveys(self):
+        """The incumbent wells as a WellSurveyStore, built once."""
 
-        Calculates the L2-distance between two pairs of coordinates,
-        the one being of an incumbent well and the other for the proposed
-        well. The depths should be equal.
+        if self.index is not None:
+            return self.index.surveys
+        if self._surveys is None:
+            self._surveys = as_surveys(self.incumbent_wells)
 
-        Args:
-            x_interp (float): The incumbent well's (synthesized) x-coordinate
-                at a depth corresponding to the prosed well's depth.
-            y_interp (float): The incumbent well's (synthesized) y-coordinate
-                at a depth corresponding to the prosed well's depth.
-            index_proposed (int): Index at the depth of the proposed well
+        return self._surveys
+
+    def _blocks(self, rows):
+        """Stations of the given rows of incumbent_wells, block by block.
+
+        Rows are sorted by their number of stations and split into blocks
+        of at most BLOCK_STATIONS padded stations, so each well is only
+        padded to the longest well of its block, see
+        WellSurveyStore.padded(), not to the longest well of the field.
+
+        Yields:
+            positions (np.array): Positions of the block within rows
+            xy (np.array): (n_block, K, 2) station x and y coordinates
+            z (np.array): (n_block, K) station depths
+        """
+
+        surveys = self.surveys()
+        lengths = surveys.lengths[rows]
+        order = np.argsort(lengths, kind="stable")
+        sorted_lengths = np.maximum(lengths[order], 1)
+        start = 0
+        while start < len(order):
+            # Padded size of the block if it ended at each of the rest
+            padded_sizes = np.arange(1, len(order) - start + 1) * sorted_lengths[start:]
+            size = np.searchsorted(padded_sizes, self.BLOCK_STATIONS, side="right")
+            positions = order[start : start + max(size, 1)]
+            yield (positions, *surveys.padded(rows[positions]))
+            start += len(positions)
+
+    def _distances_of(self, rows, stations=slice(None)):
+        """Horizontal distances of the given rows at the given stations.
+
+        Returns:
+            (np.array): (n_rows, m) distances, see distance_matrix()
+        """
+
+        no_of_stations = len(self.proposed_well[stations])
+        distances = np.empty((len(rows), no_of_stations))
+        for positions, xy, z in self._blocks(rows):
+            distances[positions] = self._horizontal_distances(xy, z, stations)
+
+        return distances
+
+    def _dense(self, rows, values):
+        """Scatters values of the selected rows into an (n_wells, M) array."""
+
+        dense = np.full((len(self.incumbent_wells), len(self.proposed_well)), np.nan)
+        dense[rows] = values
+
+        return dense
+
+    def _to_dict(self, dense):
+        """Per-well values where the depths of the wells overlap."""
+
+        values = dict()
+        is_overlapping = ~np.isnan(dense)
+        rows = np.flatnonzero(is_overlapping.any(axis=1))
+        well_names = self.surveys().names
+        for row in rows:
+            values[well_names[row]] = dense[row, is_overlapping[row]].tolist()
+
+        return values
+
+    def distance_matrix(self):
+        """Horizontal distance of every incumbent at every proposed depth.
 
         Returns:
-            distance (float): The L-2 distance between the two points.
+            distances (np.array): (n_wells, M) horizontal distances,
+                NaN where the depths of the wells don't overlap
+                or where the well was pruned by the spatial index
         """
 
-        distance = np.sqrt(
-            (x_interp - self.proposed_well[index_proposed, 0]) ** 2
-            + (y_interp - self.proposed_well[index_proposed, 1]) ** 2
-        )
+        rows = np.flatnonzero(self._candidates())
 
-        return distance
+        return self._dense(rows, self._distances_of(rows))
 
     def run(self):
         """High-level method for calculating distance between wells.
 
+        The dense (n_wells, M) result is kept as self.distances.
+
         Returns:
             distances (dict): Each key-value pair contains the distance
                 between an incumbent well (identified by key) and the
                 proposed well at every z-step of the proposed well
+                where their depths overlap
 
-        NOTE: To modify when proper well coordinates are received.                
+        NOTE: To modify when proper well coordinates are received.
         """
 
-        len_of_proposed_well = len(self.proposed_well)
-        distances = dict()
-        for _, well in self.incumbent_wells.iterrows():
-            well_distance_temp = []
-            z_incumbent = generate_zs_for_incumbent_vertical_wells(
-                well_depth=well["MaxFDypi"], len_of_proposed_well=len_of_proposed_well
-            )
-            for index_proposed in range(1, len(self.proposed_well) - 1):
-                for k in range(1, len(z_incumbent) - 1):
-                    if (
-                        z_incumbent[k]
-                        < self.proposed_well[index_proposed, 2]
-                        < z_incumbent[k + 1]
-                    ):
-                        x_interp = self._synthesize_values(
-                            index_proposed=index_proposed,
-                            value_to_interpolate=np.repeat(well["x"], 2),
-                        )
-                        y_interp = self._synthesize_values(
-                            index_proposed=index_proposed,
-                            value_to_interpolate=np.repeat(well["y"], 2),
-                        )
-                        well_distance_temp.append(
-                            self._calculate_distance(x_interp, y_interp, index_proposed)
-                        )
-            if well_distance_temp:
-                well_name = well["Borholunofn"]
-                distances[well_name] = well_distance_temp
+        self._is_calculated = self._candidates()
+        rows = np.flatnonzero(self._is_calculated)
+        self.distances = self._dense(rows, self._distances_of(rows))
+        self._previous_well = self.proposed_well.copy()
 
-        return distances
+        return self._to_dict(self.distances)
+
+    def update(self, proposed_well):
+        """Recalculates distances for a changed proposed well.
+
+        Only stations whose coordinates differ from the previous proposed
+        well are recalculated for wells that were calculated before.
+        Wells that come within range are calculated in full and wells
+        that drop out of range are cleared, so the result is the same as
+        that of run(). Falls back to run() if the number of stations
+        changed or run() hasn't been called.
+
+        Args:
+            proposed_well (np.array): (M, 3) coordinates of the proposed well
+
+        Returns:
+            distances (dict): See run()
+        """
+
+        self.proposed_well = proposed_well
+        if self.distances is None or self._previous_well.shape != proposed_well.shape:
+            return self.run()
+
+        is_moved = np.any(proposed_well != self._previous_well, axis=1)
+        is_candidate = self._candidates()
+        kept = np.flatnonzero(is_candidate & self._is_calculated)
+        added = np.flatnonzero(is_candidate & ~self._is_calculated)
+
+        self.distances[self._is_calculated & ~is_candidate] = np.nan
+        if is_moved.any() and len(kept):
+            self.distances[np.ix_(kept, is_moved)] = self._distances_of(
+                kept, stations=is_moved
+            )
+        if len(added):
+            self.distances[added] = self._distances_of(added)
+        self._is_calculated = is_candidate
+        self._previous_well = proposed_well.copy()
 
+        return self._to_dict(self.distances)
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+MiB = 1024**2
+
+
+def sha256sum(filename: str, buffer_size: int = MiB):
+    """The SHA-256 hex digest of a file, read in buffer_size blocks."""
+
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(buffer_size), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class RangeDownload:
+    """A parallel, resumable download of one large file over HTTP.
+
+    The file is split into chunk_size byte ranges that a thread pool
+    fetches with Range requests and writes in place into filename.part.
+    Finished chunks are recorded in filename.part.json, so an interrupted
+    download only fetches the chunks it is missing when run again. Servers
+    that don't support ranges are downloaded in one stream.
+
+    The size, and the SHA-256 checksum if given, are checked before
+    filename.part is renamed to filename. Failed requests raise
+    requests.HTTPError and failed checks ValueError.
+
+    Attributes:
+        url (str): The file to download
+        filename (str): Where to save it
+        checksum (str, optional): Expected SHA-256 hex digest
+        chunk_size (int, optional): Bytes per range. Defaults to 16 MiB
+        buffer_size (int, optional): Bytes per read from the connection.
+            Defaults to 1 MiB
+        max_workers (int, optional): Parallel connections. Defaults to 8
+        timeout (float, optional): Connection timeout [s]. Defaults to 60
+    """
+
+    def __init__(
+        self,
+        url: str,
+        filename: str,
+        checksum: str = None,
+        chunk_size: int = 16 * MiB,
+        buffer_size: int = MiB,
+        max_workers: int = 8,
+        timeout: float = 60,
+    ):
+        self.url = url
+        self.filename = filename
+        self.checksum = checksum
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.part_filename = f"{filename}.part"
+        self.state_filename = f"{filename}.part.json"
+
+    def _head(self):
+        """Size of the file and whether the server accepts ranges."""
+
+        response = requests.head(self.url, allow_redirects=True, timeout=self.timeout)
+        response.raise_for_status()
+        size = response.headers.get("Content-Length")
+        accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+
+        return (int(size) if size is not None else None), accepts_ranges
+
+    def _load_state(self, size: int):
+        """Chunks finished by an earlier run of the same download."""
+
+        state = dict(url=self.url, size=size, chunk_size=self.chunk_size, done=[])
+        if os.path.exists(self.state_filename) and os.path.exists(self.part_filename):
+            with open(self.state_filename) as f:
+                previous = json.load(f)
+            if all(
+                previous.get(key) == state[key] for key in ("url", "size", "chunk_size")
+            ):
+                state["done"] = previous["done"]
+        if not state["done"]:
+            with open(self.part_filename, "wb") as f:
+                f.truncate(size)
+
+        return state
+
+    def _save_state(self, state: dict):
+        tmp_filename = f"{self.state_filename}.tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_filename, self.state_filename)
+
+    def _fetch_chunk(self, chunk: int, size: int):
+        start = chunk * self.chunk_size
+        end = min(start + self.chunk_size, size) - 1
+        headers = {"Range": f"bytes={start}-{end}"}
+        with requests.get(
+            self.url, headers=headers, stream=True, timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise requests.HTTPError(
+                    f"Expected 206 Partial Content for {headers['Range']}, "
+                    f"got {response.status_code}",
+                    response=response,
+                )
+            written = 0
+            with open(self.part_filename, "r+b") as f:
+                f.seek(start)
+                for block in response.iter_content(self.buffer_size):
+                    f.write(block)
+                    written += len(block)
+        if written != end - start + 1:
+            raise ValueError(
+                f"Chunk {chunk} of {self.url}: expected {end - start + 1} bytes, "
+                f"got {written}"
+            )
+
+        return chunk
+
+    def _download_ranges(self, size: int):
+        """Fetches the missing chunks, recording each one as it finishes.
+
+        Chunks that finish are recorded even if others fail, and the first
+        failure is raised once the rest are done.
+        """
+
+        state = self._load_state(size)
+        no_of_chunks = -(-size // self.chunk_size)
+        missing = sorted(set(range(no_of_chunks)) - set(state["done"]))
+        errors = []
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            futures = [pool.submit(self._fetch_chunk, chunk, size) for chunk in missing]
+            for future in as_completed(futures):
+                try:
+                    chunk = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                state["done"].append(chunk)
+                self._save_state(state)
+                print(
+                    f"Download: {len(state['done'])}/{no_of_chunks} chunks "
+                    f"({min(len(state['done']) * self.chunk_size, size) / MiB:.0f} MiB)"
+                )
+        if errors:
+            raise errors[0]
+
+    def _download_stream(self):
+        with requests.get(self.url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            written = 0
+            with open(self.part_filename, "wb") as f:
+                for block in response.iter_content(self.buffer_size):
+                    f.write(block)
+                    written += len(block)
+                    if written // (100 * MiB) != (written - len(block)) // (100 * MiB):
+                        print(f"Download: {written / MiB:.0f} MiB")
+
+    def _verify(self, size: int):
+        actual_size = os.path.getsize(self.part_filename)
+        if size is not None and actual_size != size:
+            raise ValueError(
+                f"{self.part_filename}: expected {size} bytes, got {actual_size}"
+            )
+        if self.checksum is not None:
+            actual_checksum = sha256sum(self.part_filename, self.buffer_size)
+            if actual_checksum != self.checksum.lower():
+                raise ValueError(
+                    f"{self.part_filename}: expected SHA-256 {self.checksum}, "
+                    f"got {actual_checksum}"
+                )
+
+    def run(self):
+        """High-level method for the download.
+
+        Returns:
+            filename (str): The verified file
+        """
+
+        size, accepts_ranges = self._head()
+        if size is not None and accepts_ranges:
+            self._download_ranges(size)
+        else:
+            self._download_stream()
+
+        try:
+            self._verify(size)
+        except ValueError:
+            # Start over next time instead of resuming a corrupt file
+            for filename in (self.part_filename, self.state_filename):
+                if os.path.exists(filename):
+                    os.remove(filename)
+            raise
+        os.replace(self.part_filename, self.filename)
+        if os.path.exists(self.state_filename):
+            os.remove(self.state_filename)
+
+        return self.filename
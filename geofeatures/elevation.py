@@ -1,12 +1,17 @@
 import json
 import os
-import requests
+from concurrent.futures import ProcessPoolExecutor
 
 from osgeo import gdal
-import numpy as np
-import pandas as pd
-from scipy.interpolate import griddata
 
+from geofeatures.download import RangeDownload
+from geofeatures.grid import (
+    ElevationGrid,
+    ElevationPyramid,
+    bbox_window,
+    copy_raster,
+    read_raster,
+)
 
 with open("config.json") as f:
     settings = json.load(f)
@@ -16,13 +21,70 @@ RESOLUTION = settings["ELEVATION_RESOLUTION"]
 
 url_prefix = "https://ftp.lmi.is/gisdata/raster/"
 url = f"{url_prefix}IslandsDEMv1.0_{RESOLUTION}x{RESOLUTION}m_isn2016_zmasl.tif"
+source_map = f"data/IslandsDEMv0_{RESOLUTION}x{RESOLUTION}m_zmasl_isn93.tif"
+
+
+# The source map, opened once per worker process by _init_worker
+_worker = dict()
+
+
+def _init_worker():
+    _worker["ds"] = gdal.Open(source_map)
+
+
+def _process_location(task):
+    location, coordinates = task
+    ds = _worker["ds"]
+    xoff, yoff, xsize, ysize = bbox_window(ds, coordinates)
+    if not (xsize and ysize):
+        raise ValueError(f"{location} is outside of {source_map}")
+    elevation_data, is_nodata = read_raster(ds, xoff, yoff, xsize, ysize)
+    elevation_data.z[is_nodata] = 0
+    Process(location, coordinates).save(elevation_data)
+
+    return location
+
+
+def process_all_locations(locations: dict = locations, max_workers: int = None):
+    """Preprocesses the elevation data of many locations at once.
+
+    Each worker process opens the source map once and reads the window
+    of each of its bounding boxes straight into memory, instead of
+    clipping a GeoTIFF per location, then meshes and saves the location,
+    see Process.save(). Only the location names and bounding boxes are
+    sent to the workers.
+
+    Args:
+        locations (dict, optional): Location name as key, bounding box as
+            value. Defaults to locations_bbox in config.json
+        max_workers (int, optional): Size of the process pool.
+            Defaults to the number of cores
+
+    Returns:
+        (list): The processed locations
+    """
+
+    processed = []
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker) as pool:
+        for location in pool.map(_process_location, locations.items()):
+            processed.append(location)
+            print(f"Elevation: {location} processed")
+
+    return processed
 
 
 class Download:
-    """Downloads and preprocesses an elevation map of Iceland."""
+    """Downloads and preprocesses an elevation map of Iceland.
+
+    Attributes:
+        overwrite (bool, optional): Whether to download and warp the map.
+            Defaults to False.
+        checksum (str, optional): Expected SHA-256 of the download
+    """
 
-    def __init__(self, overwrite=False):
+    def __init__(self, overwrite=False, checksum=None):
         self.filename = "data/iceland.tif"
+        self.checksum = checksum
         if overwrite:
             self._download()
             self._warp()
@@ -31,16 +93,11 @@ class Download:
         """Downloads a raster map of Iceland.
         
         The map is from Landmælingar Íslands.
-        The elevation resolution is set in config.json
+        The elevation resolution is set in config.json.
+        Interrupted downloads resume, see RangeDownload.
         """
 
-        request = requests.get(url, stream=True)
-        if request.status_code != 200:
-            return
-
-        with open(self.filename, "wb") as f:
-            for chunk in request.iter_content(1024):
-                f.write(chunk)
+        RangeDownload(url, self.filename, checksum=self.checksum).run()
 
     def _warp(self):
         """Warps the original file.
@@ -78,10 +135,9 @@ class Process:
         Does so by zooming in to the bbox, see config.json
         """
 
-        old_map = f"data/IslandsDEMv0_{RESOLUTION}x{RESOLUTION}m_zmasl_isn93.tif"
         new_map = f"data/{self.location}.tif"
 
-        ds = gdal.Open(old_map)
+        ds = gdal.Open(source_map)
         ds = gdal.Translate(
             new_map,
             ds,
@@ -95,57 +151,105 @@ class Process:
         ds = None
 
     def detiffify(self):
-        """Converts geotiff to df.
+        """Reads the clipped geotiff into an elevation grid.
 
         Geotiffs are a little too cumbersome for this usage case.
+        Nodata pixels are set to 0.
 
         Returns:
-            (pd.DataFrame): A dataframe of the elevation data
+            (ElevationGrid): The elevation data at the pixel centres
         """
 
-        file_loc = f"data/{self.location}"
-        ds = gdal.Open(f"{file_loc}.tif")
-        xyz = gdal.Translate(f"{file_loc}.xyz", ds)
-        xyz = None
+        ds = gdal.Open(f"data/{self.location}.tif")
+        elevation_data, is_nodata = read_raster(ds)
         ds = None
+        elevation_data.z[is_nodata] = 0
 
-        df = pd.read_csv(f"{file_loc}.xyz", sep=" ", names=["x", "y", "z"], header=0)
-        os.remove(f"{file_loc}.xyz")
-        to_replace = [-3.402823466385289e38, -9999.0]  # don't know why...
-        df.replace(to_replace, 0, inplace=True)
-
-        return df
+        return elevation_data
 
-    def mesh(self, df: pd.DataFrame):
+    def mesh(self, elevation_data: ElevationGrid):
         """Generates a 3D mesh of elevation data.
-        
+
+        Bilinearly resamples the raster to MESH_RESOLUTION x MESH_RESOLUTION
+        points spanning the same extent.
+
         Args:
-            df: The elevation data in table format
+            elevation_data: The elevation data, see detiffify()
 
         Returns:
-            dict_: The elevation data as a mesh
+            (ElevationGrid): The elevation data as a mesh
         """
 
-        # Create a 2D mesh grid
-        xi = np.linspace(min(df.x), max(df.x), settings["MESH_RESOLUTION"])
-        yi = np.linspace(min(df.y), max(df.y), settings["MESH_RESOLUTION"])
-        x_mesh, y_mesh = np.meshgrid(xi, yi)
-        # Interpolate to fit grid
-        z_mesh = griddata(
-            points=(df.x, df.y), values=df.z, xi=(x_mesh, y_mesh), fill_value=0
+        return elevation_data.resample(
+            settings["MESH_RESOLUTION"], settings["MESH_RESOLUTION"]
         )
-        dict_ = dict(x=x_mesh.tolist(), y=y_mesh.tolist(), z=z_mesh.tolist())
 
-        return dict_
+    def _save(self, elevation_data: ElevationGrid):
+        elevation_data.save(f"data/{self.location}.grid")
 
-    def _save(self, elevation_data: dict):
-        with open(f"data/{self.location}.json", "w") as f:
-            json.dump(elevation_data, f)
+    def _save_pyramid(self, elevation_data: ElevationGrid):
+        ElevationPyramid.build(elevation_data).save(f"data/{self.location}.pyramid")
+
+    def save(self, elevation_data: ElevationGrid):
+        """Saves both the MESH_RESOLUTION mesh and a pyramid of the full
+        resolution data, see ElevationPyramid.
+
+        Args:
+            elevation_data: The elevation data, see detiffify()
+        """
+
+        self._save(self.mesh(elevation_data))
+        self._save_pyramid(elevation_data)
 
     def run(self):
         """High-level method for elevation data preprocessing."""
 
         self.clip()
-        df = self.detiffify()
-        dict_ = self.mesh(df)
-        self._save(dict_)
+        self.save(self.detiffify())
+
+    def _warped(self, source: str):
+        """The bbox of the source map, reprojected to ISN93 on the fly.
+
+        A virtual raster, so pixels are only warped when read, like _warp()
+        but for just the bbox and without rewriting the source.
+        """
+
+        return gdal.Warp(
+            "",
+            gdal.Open(source),
+            format="VRT",
+            dstSRS="EPSG:3057",
+            outputBounds=(
+                self.coordinates["ulx"],
+                self.coordinates["lry"],
+                self.coordinates["lrx"],
+                self.coordinates["uly"],
+            ),
+            xRes=RESOLUTION,
+            yRes=RESOLUTION,
+            resampleAlg="bilinear",
+        )
+
+    def run_chunked(self, source: str = "data/iceland.tif", tile_size: int = 2048):
+        """Out-of-core counterpart of run(), for bboxes of any size.
+
+        Clips and reprojects the source map (the download of Download)
+        tile by tile into a memory-mapped level 0 of the pyramid, builds
+        the coarser levels from disk and samples the mesh from level 0.
+        Memory use is bounded by tile_size, so the bbox can be the whole
+        country.
+
+        Args:
+            source (str, optional): The map to read.
+                Defaults to data/iceland.tif
+            tile_size (int, optional): Tile side in pixels. Defaults to 2048
+        """
+
+        directory = f"data/{self.location}.pyramid"
+        os.makedirs(directory, exist_ok=True)
+        copy_raster(
+            self._warped(source), os.path.join(directory, "level-0.grid"), tile_size
+        )
+
+        pyramid = ElevationPyramid.build_on_disk(directory, tile_size)
+        self._save(self.mesh(pyramid.levels[0]))
@@ -0,0 +1,481 @@
+import os
+import re
+import struct
+
+import numpy as np
+
+
+def _cell(coordinate, origin, spacing, size):
+    """Lower cell index and fractional offset along one axis of a grid."""
+
+    f = np.clip((coordinate - origin) / spacing, 0, size - 1)
+    lower = np.minimum(np.floor(f).astype(int), max(size - 2, 0))
+
+    return lower, f - lower
+
+
+def _block_mean(z):
+    """Means of 2x2 blocks, repeating the last row or column of odd arrays."""
+
+    rows, cols = z.shape
+    z = np.pad(z, ((0, rows % 2), (0, cols % 2)), mode="edge")
+
+    return z.reshape(z.shape[0] // 2, 2, z.shape[1] // 2, 2).mean(axis=(1, 3))
+
+
+NODATA_VALUES = [-3.402823466385289e38, -9999.0]  # don't know why...
+
+
+def read_raster(ds, xoff=0, yoff=0, xsize=None, ysize=None):
+    """Reads (a window of) the first band of a north-up raster.
+
+    Args:
+        ds (gdal.Dataset): The raster
+        xoff, yoff (int, optional): Pixel offset of the window
+        xsize, ysize (int, optional): Window size, defaults to the rest
+            of the raster
+
+    Returns:
+        elevation_data (ElevationGrid): Values at the pixel centres,
+            with rows flipped so that y increases
+        is_nodata (np.array): Boolean mask of nodata pixels
+    """
+
+    if xsize is None:
+        xsize = ds.RasterXSize - xoff
+    if ysize is None:
+        ysize = ds.RasterYSize - yoff
+    band = ds.GetRasterBand(1)
+    z = band.ReadAsArray(xoff, yoff, xsize, ysize).astype(np.float32)[::-1]
+
+    nodata_values = list(NODATA_VALUES)
+    if band.GetNoDataValue() is not None:
+        nodata_values.append(band.GetNoDataValue())
+    is_nodata = np.isin(z, np.array(nodata_values, dtype=np.float32))
+
+    ulx, dx, _, uly, _, dy = ds.GetGeoTransform()
+    x0 = ulx + (xoff + 0.5) * dx
+    y0 = uly + (yoff + ysize - 0.5) * dy
+
+    return ElevationGrid(np.ascontiguousarray(z), x0, dx, y0, -dy), is_nodata
+
+
+def bbox_window(ds, coordinates: dict):
+    """Pixel window of a north-up raster that covers a bounding box.
+
+    The window is clipped to the raster, so it's empty (of size 0) for a
+    bounding box entirely outside of it.
+
+    Args:
+        ds (gdal.Dataset): The raster
+        coordinates (dict): Location bounding box, see config.json
+
+    Returns:
+        xoff, yoff, xsize, ysize (int): See read_raster()
+    """
+
+    ulx, dx, _, uly, _, dy = ds.GetGeoTransform()
+    columns = np.array([coordinates["ulx"], coordinates["lrx"]]) - ulx
+    rows = np.array([coordinates["uly"], coordinates["lry"]]) - uly
+    xoff, xend = np.clip(np.round(columns / dx).astype(int), 0, ds.RasterXSize)
+    yoff, yend = np.clip(np.round(rows / dy).astype(int), 0, ds.RasterYSize)
+
+    return int(xoff), int(yoff), int(xend - xoff), int(yend - yoff)
+
+
+class ElevationGrid:
+    """A regular elevation grid and its geotransform.
+
+    z[i, j] is the elevation at x = x0 + j*dx, y = y0 + i*dy, with x and y
+    increasing along columns and rows respectively, i.e. the same layout
+    as np.meshgrid(x, y).
+
+    On disk the grid is a small fixed-size header followed by the raw
+    little-endian float32 values, so it can be memory-mapped and read
+    without parsing.
+
+    Attributes:
+        z (np.array): (rows, cols) elevation values
+        x0, y0 (float): Coordinates of z[0, 0]
+        dx, dy (float): Grid spacing
+    """
+
+    MAGIC = b"GEOWELL1"
+    # magic, rows, cols, x0, dx, y0, dy, padded to 64 bytes
+    HEADER = struct.Struct("<8sQQdddd8x")
+    DTYPE = np.dtype("<f4")
+
+    def __init__(self, z, x0: float, dx: float, y0: float, dy: float):
+        self.z = z
+        self.x0 = x0
+        self.dx = dx
+        self.y0 = y0
+        self.dy = dy
+
+    @property
+    def shape(self):
+        return self.z.shape
+
+    @property
+    def x(self):
+        return self.x0 + self.dx * np.arange(self.shape[1])
+
+    @property
+    def y(self):
+        return self.y0 + self.dy * np.arange(self.shape[0])
+
+    def mesh(self):
+        """The grid as x, y and z meshes, x and y being zero-copy views.
+
+        Returns:
+            x_mesh, y_mesh, z_mesh (np.array): (rows, cols) arrays
+        """
+
+        x_mesh = np.broadcast_to(self.x[None, :], self.shape)
+        y_mesh = np.broadcast_to(self.y[:, None], self.shape)
+
+        return x_mesh, y_mesh, self.z
+
+    def sample(self, x, y):
+        """Bilinear elevation at arbitrary points.
+
+        Points outside the grid get the elevation at the nearest edge.
+
+        Args:
+            x, y (np.array): Coordinates, broadcast against each other
+
+        Returns:
+            (np.array): Elevation at each point
+        """
+
+        rows, cols = self.shape
+        i, ty = _cell(np.asarray(y, dtype=float), self.y0, self.dy, rows)
+        j, tx = _cell(np.asarray(x, dtype=float), self.x0, self.dx, cols)
+        i_next = np.minimum(i + 1, rows - 1)
+        j_next = np.minimum(j + 1, cols - 1)
+        z = self.z
+
+        return (1 - ty) * ((1 - tx) * z[i, j] + tx * z[i, j_next]) + ty * (
+            (1 - tx) * z[i_next, j] + tx * z[i_next, j_next]
+        )
+
+    def _window_slices(self, extent):
+        xmin, xmax, ymin, ymax = extent
+        rows, cols = self.shape
+        j0 = np.floor((xmin - self.x0) / self.dx)
+        j1 = np.ceil((xmax - self.x0) / self.dx)
+        i0 = np.floor((ymin - self.y0) / self.dy)
+        i1 = np.ceil((ymax - self.y0) / self.dy)
+
+        return (
+            slice(int(np.clip(i0, 0, rows)), int(np.clip(i1 + 1, 0, rows))),
+            slice(int(np.clip(j0, 0, cols)), int(np.clip(j1 + 1, 0, cols))),
+        )
+
+    def window(self, extent):
+        """The smallest part of the grid that covers an extent.
+
+        Only the window is read from a memory-mapped grid.
+
+        Args:
+            extent (tuple): (xmin, xmax, ymin, ymax)
+
+        Returns:
+            (ElevationGrid): The window, a view into this grid
+        """
+
+        rows, cols = self._window_slices(extent)
+
+        return ElevationGrid(
+            self.z[rows, cols],
+            self.x0 + cols.start * self.dx,
+            self.dx,
+            self.y0 + rows.start * self.dy,
+            self.dy,
+        )
+
+    def downsample(self):
+        """Halves the resolution by averaging 2x2 blocks.
+
+        Odd grids are padded by repeating the last row or column.
+
+        Returns:
+            (ElevationGrid): The coarser grid
+        """
+
+        return ElevationGrid(
+            _block_mean(self.z).astype(self.DTYPE),
+            self.x0 + self.dx / 2,
+            2 * self.dx,
+            self.y0 + self.dy / 2,
+            2 * self.dy,
+        )
+
+    def resample(self, rows: int, cols: int):
+        """Bilinearly resamples the grid to a new shape over the same extent.
+
+        Takes linear time in the number of output points, as the
+        source is known to be a regular grid.
+
+        Args:
+            rows, cols (int): Shape of the new grid
+
+        Returns:
+            (ElevationGrid): The resampled grid
+        """
+
+        xi = np.linspace(self.x[0], self.x[-1], cols)
+        yi = np.linspace(self.y[0], self.y[-1], rows)
+        z = self.sample(xi[None, :], yi[:, None])
+        dx = xi[1] - xi[0] if cols > 1 else self.dx
+        dy = yi[1] - yi[0] if rows > 1 else self.dy
+
+        return ElevationGrid(z, xi[0], dx, yi[0], dy)
+
+    @classmethod
+    def create(cls, filename: str, rows: int, cols: int, x0, dx, y0, dy):
+        """Creates a grid file of the given shape, memory-mapped for writing.
+
+        The values start out as zeros and are written through z. Grids
+        larger than memory can be filled this way, one window at a time.
+
+        Returns:
+            (ElevationGrid): The grid
+        """
+
+        with open(filename, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, rows, cols, x0, dx, y0, dy))
+            f.truncate(cls.HEADER.size + rows * cols * cls.DTYPE.itemsize)
+        z = np.memmap(
+            filename,
+            dtype=cls.DTYPE,
+            mode="r+",
+            offset=cls.HEADER.size,
+            shape=(rows, cols),
+        )
+
+        return cls(z, x0, dx, y0, dy)
+
+    def save(self, filename: str):
+        rows, cols = self.shape
+        with open(filename, "wb") as f:
+            f.write(
+                self.HEADER.pack(
+                    self.MAGIC, rows, cols, self.x0, self.dx, self.y0, self.dy
+                )
+            )
+            np.ascontiguousarray(self.z, dtype=self.DTYPE).tofile(f)
+
+    @classmethod
+    def load(cls, filename: str, mmap: bool = True):
+        """Opens a grid saved with save().
+
+        Args:
+            filename (str): Path to the grid
+            mmap (bool, optional): Memory-map the values instead of reading
+                them into memory. Defaults to True.
+
+        Returns:
+            (ElevationGrid): The grid, read-only if memory-mapped
+        """
+
+        with open(filename, "rb") as f:
+            header = f.read(cls.HEADER.size)
+        magic, rows, cols, x0, dx, y0, dy = cls.HEADER.unpack(header)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{filename} is not an elevation grid")
+
+        if mmap:
+            z = np.memmap(
+                filename,
+                dtype=cls.DTYPE,
+                mode="r",
+                offset=cls.HEADER.size,
+                shape=(rows, cols),
+            )
+        else:
+            z = np.fromfile(filename, dtype=cls.DTYPE, offset=cls.HEADER.size).reshape(
+                rows, cols
+            )
+
+        return cls(z, x0, dx, y0, dy)
+
+
+def copy_raster(ds, filename: str, tile_size: int = 2048):
+    """Copies a north-up raster into a grid file, tile by tile.
+
+    Memory use is bounded by tile_size, however large the raster.
+    Nodata pixels are set to 0, see read_raster().
+
+    Args:
+        ds (gdal.Dataset): The raster
+        filename (str): The grid file, see ElevationGrid.create()
+        tile_size (int, optional): Tile side in pixels. Defaults to 2048
+
+    Returns:
+        (ElevationGrid): The written grid, memory-mapped
+    """
+
+    rows, cols = ds.RasterYSize, ds.RasterXSize
+    ulx, dx, _, uly, _, dy = ds.GetGeoTransform()
+    grid = ElevationGrid.create(
+        filename, rows, cols, ulx + 0.5 * dx, dx, uly + (rows - 0.5) * dy, -dy
+    )
+
+    for yoff in range(0, rows, tile_size):
+        ysize = min(tile_size, rows - yoff)
+        for xoff in range(0, cols, tile_size):
+            xsize = min(tile_size, cols - xoff)
+            tile, is_nodata = read_raster(ds, xoff, yoff, xsize, ysize)
+            tile.z[is_nodata] = 0
+            # read_raster flips the rows so that y increases
+            grid.z[rows - yoff - ysize : rows - yoff, xoff : xoff + xsize] = tile.z
+    grid.z.flush()
+
+    return grid
+
+
+class ElevationPyramid:
+    """Elevation grids of one area at successively halved resolutions.
+
+    Level 0 is the full-resolution raster and every following level
+    averages 2x2 blocks of the one before, down to MIN_SIZE points a side.
+    Consumers ask for the finest level that fits a pixel budget over the
+    extent they show, so a wellpad gets full detail while a whole field
+    is drawn coarsely.
+
+    On disk the pyramid is a directory of memory-mapped grids,
+    level-0.grid, level-1.grid, ..., so a query only reads the window it
+    needs from the level it picks.
+
+    Attributes:
+        levels (list): ElevationGrid of each level, finest first
+    """
+
+    MIN_SIZE = 32
+
+    def __init__(self, levels: list):
+        self.levels = levels
+
+    @classmethod
+    def build(cls, elevation_data: ElevationGrid):
+        """Builds the pyramid from a full-resolution grid."""
+
+        levels = [elevation_data]
+        while max(levels[-1].shape) > cls.MIN_SIZE:
+            levels.append(levels[-1].downsample())
+
+        return cls(levels)
+
+    @staticmethod
+    def _level_numbers(directory: str):
+        """Numbers n of the level-n.grid files in a directory, sorted."""
+
+        pattern = re.compile(r"level-(\d+)\.grid$")
+        matches = (pattern.match(name) for name in os.listdir(directory))
+
+        return sorted(int(match.group(1)) for match in matches if match)
+
+    @classmethod
+    def _remove_stale_levels(cls, directory: str, no_of_levels: int):
+        """Removes the levels left in a directory by a deeper pyramid."""
+
+        for n in cls._level_numbers(directory):
+            if n >= no_of_levels:
+                os.remove(os.path.join(directory, f"level-{n}.grid"))
+
+    @classmethod
+    def build_on_disk(cls, directory: str, tile_size: int = 2048):
+        """Builds the pyramid above directory/level-0.grid, out of core.
+
+        Every level is written to its own grid file tile by tile, so
+        memory use is bounded by tile_size regardless of the size of
+        level 0. The result is the same as build() and save().
+
+        Args:
+            directory (str): Directory with level-0.grid
+            tile_size (int, optional): Tile side in points of the level
+                being read, rounded down to an even number. Defaults to 2048
+
+        Returns:
+            (ElevationPyramid): The pyramid, memory-mapped
+        """
+
+        tile_size = max(2, tile_size - tile_size % 2)
+        levels = [ElevationGrid.load(os.path.join(directory, "level-0.grid"))]
+        while max(levels[-1].shape) > cls.MIN_SIZE:
+            level = levels[-1]
+            rows, cols = level.shape
+            coarser = ElevationGrid.create(
+                os.path.join(directory, f"level-{len(levels)}.grid"),
+                -(-rows // 2),
+                -(-cols // 2),
+                level.x0 + level.dx / 2,
+                2 * level.dx,
+                level.y0 + level.dy / 2,
+                2 * level.dy,
+            )
+            for i in range(0, rows, tile_size):
+                for j in range(0, cols, tile_size):
+                    coarser.z[
+                        i // 2 : (i + tile_size) // 2, j // 2 : (j + tile_size) // 2
+                    ] = _block_mean(level.z[i : i + tile_size, j : j + tile_size])
+            coarser.z.flush()
+            levels.append(coarser)
+        cls._remove_stale_levels(directory, len(levels))
+
+        return cls(levels)
+
+    def save(self, directory: str):
+        """Saves every level, removing levels left by a deeper pyramid."""
+
+        os.makedirs(directory, exist_ok=True)
+        self._remove_stale_levels(directory, len(self.levels))
+        for n, level in enumerate(self.levels):
+            level.save(os.path.join(directory, f"level-{n}.grid"))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True):
+        """Opens a pyramid saved with save(), see ElevationGrid.load()."""
+
+        numbers = cls._level_numbers(directory)
+        if not numbers:
+            raise ValueError(f"{directory} has no elevation grids")
+
+        return cls(
+            [
+                ElevationGrid.load(os.path.join(directory, f"level-{n}.grid"), mmap)
+                for n in numbers
+            ]
+        )
+
+    def select_level(self, extent, max_pixels: int):
+        """The finest level with at most max_pixels points over the extent.
+
+        Args:
+            extent (tuple): (xmin, xmax, ymin, ymax)
+            max_pixels (int): Pixel budget
+
+        Returns:
+            (int): The level, the coarsest one if none fits the budget
+        """
+
+        for n, level in enumerate(self.levels):
+            rows, cols = level._window_slices(extent)
+            if (rows.stop - rows.start) * (cols.stop - cols.start) <= max_pixels:
+                return n
+
+        return len(self.levels) - 1
+
+    def query(self, extent, max_pixels: int):
+        """The elevation over an extent at the finest level that fits the budget.
+
+        Args:
+            extent (tuple): (xmin, xmax, ymin, ymax)
+            max_pixels (int): Pixel budget
+
+        Returns:
+            (ElevationGrid): A window of the selected level
+        """
+
+        return self.levels[self.select_level(extent, max_pixels)].window(extent)
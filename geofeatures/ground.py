@@ -0,0 +1,78 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from geofeatures.grid import ElevationGrid, ElevationPyramid
+
+with open("config.json") as f:
+    settings = json.load(f)
+
+
+class GroundElevation:
+    """Ground elevation lookups on top of the elevation cache.
+
+    All methods take arrays of points and sample the grid bilinearly in
+    one call, see ElevationGrid.sample(). Elevations are in metres above
+    sea level, while trajectory z is depth below sea level, so a wellhead
+    at elevation Z has z = -Z.
+
+    Attributes:
+        elevation_data (ElevationGrid): The grid to sample
+    """
+
+    def __init__(self, elevation_data: ElevationGrid):
+        self.elevation_data = elevation_data
+
+    @classmethod
+    def load(cls, location: str = None):
+        """Opens the finest elevation data saved for a location.
+
+        That is level 0 of data/<location>.pyramid, or the mesh in
+        data/<location>.grid if there is no pyramid. Both are memory-mapped,
+        so only the pages around the queried points are read.
+
+        Args:
+            location (str, optional): Defaults to geothermal_area in config.json
+        """
+
+        location = location or settings["geothermal_area"]
+        if os.path.isdir(f"data/{location}.pyramid"):
+            elevation_data = ElevationPyramid.load(f"data/{location}.pyramid").levels[0]
+        else:
+            elevation_data = ElevationGrid.load(f"data/{location}.grid")
+
+        return cls(elevation_data)
+
+    def at(self, x, y):
+        """Ground elevation at points.
+
+        Args:
+            x, y (np.array): ISN93 coordinates, broadcast against each other
+
+        Returns:
+            (np.array): Elevation [m a.s.l.] at each point
+        """
+
+        return self.elevation_data.sample(x, y)
+
+    def depth_below_ground(self, coordinates: np.array):
+        """Depth below the ground straight above each station.
+
+        Args:
+            coordinates (np.array): (..., 3) x, y and z of trajectory stations,
+                e.g. from TrajectoryBatch.assemble()
+
+        Returns:
+            (np.array): (...) depth below ground, negative above it
+        """
+
+        return coordinates[..., 2] + self.at(coordinates[..., 0], coordinates[..., 1])
+
+
+@lru_cache(maxsize=None)
+def ground_elevation(location: str = None):
+    """GroundElevation of a location, loaded once per process."""
+
+    return GroundElevation.load(location)
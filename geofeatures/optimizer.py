@@ -0,0 +1,268 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from geofeatures.distance import Distance
+from geofeatures.spatial import WellIndex
+from geofeatures.trajectory import TrajectoryBatch, is_feasible
+
+with open("config.json") as f:
+    settings = json.load(f)
+
+# Upper limit on incumbent wells times proposed stations in one Distance
+# call of min_distances(), to bound the size of the distance matrix
+BLOCK_SIZE = 2**22
+
+# The incumbent wells and their WellIndex, set up once per process by
+# init_worker, for min_distances() and evaluate()
+_worker = dict()
+
+
+def init_worker(incumbent_wells, max_distance: float):
+    _worker["incumbent_wells"] = incumbent_wells
+    _worker["index"] = WellIndex(incumbent_wells)
+    _worker["max_distance"] = max_distance
+
+
+def min_distances(coordinates: np.array):
+    """Minimum horizontal distance of many trajectories to the incumbent wells.
+
+    Distances are at equal depth, see Distance, with the wells that
+    init_worker() set up. The stations of as many trajectories as fit in
+    BLOCK_SIZE are measured in a single Distance call, and distances
+    beyond max_distance are left out like the wells pruned by the index.
+
+    Args:
+        coordinates (np.array): (n, M, 3) trajectories, see
+            TrajectoryBatch.assemble()
+
+    Returns:
+        min_distance (np.array): (n,) distance to the nearest well,
+            NaN where no well is within max_distance
+        nearest_well (np.array): (n,) name of the nearest well, or None
+    """
+
+    incumbent_wells = _worker["incumbent_wells"]
+    max_distance = _worker["max_distance"]
+    surveys = _worker["index"].surveys
+    n_wells = len(surveys)
+    n, no_of_stations, _ = coordinates.shape
+    if n_wells == 0:
+        return np.full(n, np.nan), np.full(n, None, dtype=object)
+    per_block = max(1, BLOCK_SIZE // (n_wells * no_of_stations))
+
+    distances = np.empty((n, n_wells))
+    for start in range(0, n, per_block):
+        block = coordinates[start : start + per_block]
+        distance_matrix = Distance(
+            incumbent_wells,
+            block.reshape(-1, 3),
+            index=_worker["index"],
+            max_distance=max_distance,
+        ).distance_matrix()
+        distance_matrix = distance_matrix.reshape(n_wells, len(block), no_of_stations)
+        distances[start : start + len(block)] = np.fmin.reduce(
+            distance_matrix, axis=2, initial=np.inf
+        ).T
+    distances[distances > max_distance] = np.nan
+
+    is_near = ~np.isnan(distances).all(axis=1)
+    nearest = np.argmin(np.where(np.isnan(distances), np.inf, distances), axis=1)
+    min_distance = np.where(is_near, distances[np.arange(n), nearest], np.nan)
+    well_names = surveys.names.astype(object)
+    nearest_well = np.where(is_near, well_names[nearest], None)
+
+    return min_distance, nearest_well
+
+
+def evaluate(candidates: pd.DataFrame):
+    """Minimum clearance and horizontal throw of candidate trajectories.
+
+    Clearance is the minimum horizontal distance at equal depth to any
+    incumbent well, see min_distances(). It is capped at max_distance,
+    as wells further away are left out.
+
+    Args:
+        candidates (pd.DataFrame): Trajectory parameters, one row per well
+
+    Returns:
+        clearance (np.array): Minimum clearance of each candidate
+        throw (np.array): Horizontal throw at the bottom of each candidate
+    """
+
+    coordinates, _ = TrajectoryBatch(candidates).assemble()
+    min_distance, _ = min_distances(coordinates)
+    clearance = np.fmin(min_distance, _worker["max_distance"])
+    throw = np.hypot(
+        coordinates[:, -1, 0] - coordinates[:, 0, 0],
+        coordinates[:, -1, 1] - coordinates[:, 0, 1],
+    )
+
+    return clearance, throw
+
+
+def pareto_front(clearance: np.array, throw: np.array, decimals: int = 3):
+    """Candidates that no other candidate beats in both clearance and throw.
+
+    Larger clearance and smaller throw are better. Both are compared
+    after rounding, so float noise alone does not make a candidate better.
+
+    Args:
+        clearance (np.array): Clearance of each candidate
+        throw (np.array): Horizontal throw of each candidate
+        decimals (int, optional): Decimals to compare at, in metres.
+            Defaults to 3
+
+    Returns:
+        (np.array): Indices of the Pareto-optimal candidates, by throw
+    """
+
+    clearance = np.round(clearance, decimals)
+    throw = np.round(throw, decimals)
+    order = np.lexsort((-clearance, throw))
+    best_so_far = np.maximum.accumulate(clearance[order])
+    is_improvement = np.r_[True, clearance[order][1:] > best_so_far[:-1]]
+
+    return order[is_improvement]
+
+
+class Optimizer:
+    """Searches for trajectories that keep clear of incumbent wells.
+
+    Randomly samples the trajectory parameters within the given bounds,
+    then refines around the current Pareto set over a few rounds.
+    Candidates are evaluated in batches with TrajectoryBatch and Distance,
+    spread across a process pool.
+
+    Attributes:
+        bounds (dict): (low, high) for each parameter to search, e.g.
+            {"az": (0, 360), "kop": (300, 800)}. The rest are kept fixed
+        incumbent_wells: Incumbent wells, see Distance
+        parameters (dict, optional): Fixed parameters.
+            Defaults to default_values in config.json
+        max_mmd (float, optional): Upper limit on measured depth
+        max_bu (float, optional): Upper limit on build-up rate
+        max_distance (float, optional): Clearance cap and pruning distance.
+            Defaults to max_distance in config.json
+        max_workers (int, optional): Size of the process pool. Defaults to
+            the number of cores. With 1, candidates are evaluated in-process
+        seed (int, optional): Random seed. Defaults to 0
+    """
+
+    def __init__(
+        self,
+        bounds: dict,
+        incumbent_wells,
+        parameters: dict = None,
+        max_mmd: float = None,
+        max_bu: float = None,
+        max_distance: float = None,
+        max_workers: int = None,
+        seed: int = 0,
+    ):
+        self.bounds = {key: tuple(map(float, val)) for key, val in bounds.items()}
+        self.incumbent_wells = incumbent_wells
+        self.parameters = dict(parameters or settings["default_values"])
+        self.max_mmd = max_mmd if max_mmd is not None else np.inf
+        self.max_bu = max_bu if max_bu is not None else np.inf
+        if max_distance is None:
+            max_distance = settings["max_distance"]
+        self.max_distance = max_distance
+        self.max_workers = max_workers or os.cpu_count()
+        self.rng = np.random.default_rng(seed)
+
+    def _sample(self, n_candidates: int, around: pd.DataFrame = None, spread=0.1):
+        """Samples uniformly within bounds, or normally around given candidates."""
+
+        candidates = pd.DataFrame(
+            {key: np.full(n_candidates, val) for key, val in self.parameters.items()}
+        )
+        if around is not None:
+            # Each candidate is sampled around a single one of the given ones
+            rows = self.rng.integers(len(around), size=n_candidates)
+        for key, (low, high) in self.bounds.items():
+            if around is None:
+                values = self.rng.uniform(low, high, n_candidates)
+            else:
+                centres = around[key].to_numpy()[rows]
+                values = centres + self.rng.normal(
+                    0, spread * (high - low), n_candidates
+                )
+            candidates[key] = np.clip(values, low, high)
+        candidates["dip"] = np.round(candidates["dip"]).astype(int)
+
+        return candidates[self._is_feasible(candidates)].reset_index(drop=True)
+
+    def _is_feasible(self, candidates: pd.DataFrame):
+        return is_feasible(candidates, self.max_mmd, self.max_bu)
+
+    def _evaluate(self, candidates: pd.DataFrame, batch_size: int, pool):
+        candidates = candidates.assign(clearance=np.nan, throw=np.nan)
+        if candidates.empty:
+            return candidates
+        batches = [
+            candidates.iloc[start : start + batch_size]
+            for start in range(0, len(candidates), batch_size)
+        ]
+        if pool is None:
+            results = map(evaluate, batches)
+        else:
+            results = pool.map(evaluate, batches)
+        clearance, throw = zip(*results)
+
+        candidates["clearance"] = np.concatenate(clearance)
+        candidates["throw"] = np.concatenate(throw)
+
+        return candidates
+
+    def run(self, n_candidates=2000, n_rounds=3, batch_size=100):
+        """High-level method for the search.
+
+        Args:
+            n_candidates (int, optional): Candidates per round. Defaults to 2000
+            n_rounds (int, optional): Rounds, the first one uniform and the
+                rest around the Pareto set. Defaults to 3
+            batch_size (int, optional): Candidates per task. Defaults to 100
+
+        Returns:
+            (pd.DataFrame): The Pareto set of clearance against horizontal
+                throw, by increasing throw, with the trajectory parameters
+        """
+
+        if self.max_workers == 1:
+            init_worker(self.incumbent_wells, self.max_distance)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(
+                self.max_workers,
+                initializer=init_worker,
+                initargs=(self.incumbent_wells, self.max_distance),
+            )
+
+        try:
+            evaluated = self._evaluate(self._sample(n_candidates), batch_size, pool)
+            for round_ in range(1, n_rounds):
+                if evaluated.empty:
+                    break
+                pareto = evaluated.iloc[
+                    pareto_front(
+                        evaluated["clearance"].values, evaluated["throw"].values
+                    )
+                ]
+                candidates = self._sample(
+                    n_candidates, around=pareto, spread=0.1 / round_
+                )
+                evaluated = pd.concat(
+                    (evaluated, self._evaluate(candidates, batch_size, pool)),
+                    ignore_index=True,
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        front = pareto_front(evaluated["clearance"].values, evaluated["throw"].values)
+
+        return evaluated.iloc[front].reset_index(drop=True)
@@ -0,0 +1,52 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from geofeatures.surveys import as_surveys
+
+
+class WellIndex:
+    """A KD-tree over the horizontal positions of incumbent well stations.
+
+    Built once per set of incumbent wells and then queried for the wells
+    that can possibly come within some distance of a proposed well. That
+    way the cost of a distance calculation grows with the number of
+    nearby wells rather than with the size of the field.
+
+    Attributes:
+        incumbent_wells: Incumbent wells, see Distance
+        surveys (WellSurveyStore): Their survey stations
+    """
+
+    def __init__(self, incumbent_wells):
+        self.incumbent_wells = incumbent_wells
+        self.surveys = as_surveys(incumbent_wells)
+        xy = self.surveys.stations[:, :2]
+
+        self.tree = cKDTree(xy)
+        self.well_of_point = self.surveys.well_of_station()
+        # Positions in between stations are interpolated, so they are at
+        # most half the longest segment away from a station
+        is_segment = np.diff(self.well_of_point) == 0
+        segment_lengths = np.linalg.norm(np.diff(xy, axis=0)[is_segment], axis=-1)
+        self.slack = segment_lengths.max(initial=0) / 2
+
+    def candidates(self, proposed_well: np.array, max_distance: float):
+        """Finds wells that may be within max_distance of the proposed well.
+
+        Queries the corridor of radius max_distance around the stations
+        of the proposed well, so no well closer than that is missed.
+
+        Args:
+            proposed_well (np.array): (M, 3) coordinates of the proposed well
+            max_distance (float): Horizontal search distance
+
+        Returns:
+            (np.array): Sorted row indices of the candidate wells
+        """
+
+        neighbours = self.tree.query_ball_point(
+            proposed_well[:, :2], r=max_distance + self.slack, return_sorted=False
+        )
+        points = np.concatenate([np.asarray(n, dtype=int) for n in neighbours])
+
+        return np.unique(self.well_of_point[points])
@@ -0,0 +1,213 @@
+import json
+import os
+
+import numpy as np
+
+with open("config.json") as f:
+    settings = json.load(f)
+
+
+def generate_zs_for_incumbent_vertical_wells(well_depth, num=2):
+    """Station depths of vertical wells, from the wellhead to well_depth.
+
+    Two stations suffice for a vertical (straight) well since
+    positions in between are interpolated linearly.
+
+    Args:
+        well_depth (float or np.array): Well depth(s)
+        num (int, optional): Number of stations. Defaults to 2.
+
+    Returns:
+        (np.array): (..., num) station depths
+    """
+
+    return np.linspace(settings["default_values"]["Z"], well_depth, num, axis=-1)
+
+
+class WellSurveyStore:
+    """Survey stations of many wells in one contiguous array.
+
+    The stations of well j are stations[offsets[j]:offsets[j + 1]], like
+    the rows of a CSR matrix, so wells of any length are stored without
+    padding or per-well Python objects. Depth is assumed not to decrease
+    along a well.
+
+    On disk the store is a directory of .npy files that load()
+    memory-maps, so opening it reads nothing but the names:
+
+        stations.npy (S, 3) float64, offsets.npy (n + 1,) int64,
+        names.npy (n,) unicode
+
+    Attributes:
+        stations (np.array): (S, 3) x, y and z of all stations
+        offsets (np.array): (n_wells + 1,) start of each well in stations
+        names (np.array): (n_wells,) well names (Borholunofn)
+    """
+
+    FILES = ("stations", "offsets", "names")
+
+    def __init__(self, stations: np.array, offsets: np.array, names: np.array):
+        self.stations = stations
+        self.offsets = offsets
+        self.names = names
+        self._index_of_name = None
+
+    @classmethod
+    def from_surveys(cls, surveys: dict):
+        """Builds a store from well name as key, (K, 3) stations as value.
+
+        Raises:
+            ValueError: If a well has no stations
+        """
+
+        stations = [
+            np.asarray(well, dtype=float).reshape(-1, 3) for well in surveys.values()
+        ]
+        lengths = [len(well) for well in stations]
+        if 0 in lengths:
+            empty = [name for name, n in zip(surveys, lengths) if n == 0]
+            raise ValueError(f"Wells without stations: {empty}")
+
+        return cls(
+            np.concatenate(stations) if stations else np.empty((0, 3)),
+            np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))),
+            np.array(list(surveys.keys()), dtype=str),
+        )
+
+    @classmethod
+    def from_wells(cls, incumbent_wells):
+        """Builds a store of vertical wells from a pd.DataFrame in wells.csv format."""
+
+        z = generate_zs_for_incumbent_vertical_wells(
+            incumbent_wells["MaxFDypi"].to_numpy(dtype=float)
+        )
+        n_wells, no_of_stations = z.shape
+        wellheads = incumbent_wells[["x", "y"]].to_numpy(dtype=float)
+        stations = np.concatenate(
+            (np.repeat(wellheads, no_of_stations, axis=0), z.reshape(-1, 1)), axis=1
+        )
+
+        return cls(
+            stations,
+            no_of_stations * np.arange(n_wells + 1, dtype=np.int64),
+            incumbent_wells["Borholunofn"].to_numpy(dtype=str),
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        for j in range(len(self)):
+            yield self.well(j)
+
+    @property
+    def lengths(self):
+        """Number of stations of each well."""
+
+        return np.diff(self.offsets)
+
+    def index_of(self, name: str):
+        if self._index_of_name is None:
+            self._index_of_name = {name: j for j, name in enumerate(self.names)}
+
+        return self._index_of_name[name]
+
+    def well(self, key):
+        """Stations of one well, by position or name, as a view.
+
+        Returns:
+            (np.array): (K, 3) x, y and z
+        """
+
+        j = self.index_of(key) if isinstance(key, str) else key
+
+        return self.stations[self.offsets[j] : self.offsets[j + 1]]
+
+    def depth_slice(self, key, z_min: float, z_max: float):
+        """Stations of one well between two depths, as a view.
+
+        The stations just outside the range are included, so that the
+        well can be interpolated anywhere within it.
+
+        Returns:
+            (np.array): (k, 3) x, y and z
+        """
+
+        stations = self.well(key)
+        z = stations[:, 2]
+        lower = max(np.searchsorted(z, z_min, side="right") - 1, 0)
+        upper = min(np.searchsorted(z, z_max, side="left") + 1, len(z))
+
+        return stations[lower:upper]
+
+    def well_of_station(self):
+        """(S,) position of the well each station belongs to."""
+
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def padded(self, rows=None):
+        """Stations of many wells as rectangular arrays.
+
+        Shorter wells are padded by repeating their last station, which
+        doesn't change interpolation along them, see interpolate_rows().
+
+        Args:
+            rows (np.array, optional): Positions of the wells. Defaults to all
+
+        Returns:
+            xy (np.array): (n_rows, K, 2) x and y coordinates
+            z (np.array): (n_rows, K) depths
+
+        Raises:
+            ValueError: If a well has no stations to pad with
+        """
+
+        if rows is None:
+            rows = np.arange(len(self))
+        starts = self.offsets[rows]
+        lengths = self.offsets[np.asarray(rows) + 1] - starts
+        if (lengths == 0).any():
+            raise ValueError(
+                f"Wells without stations: {list(self.names[rows][lengths == 0])}"
+            )
+        no_of_stations = lengths.max(initial=1)
+        steps = np.minimum(np.arange(no_of_stations), lengths[:, None] - 1)
+        stations = self.stations[starts[:, None] + steps]
+
+        return stations[..., :2], stations[..., 2]
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.FILES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True):
+        """Opens a store saved with save().
+
+        Args:
+            directory (str): Path to the store
+            mmap (bool, optional): Memory-map the stations and offsets
+                instead of reading them into memory. Defaults to True.
+
+        Returns:
+            (WellSurveyStore): The store, read-only if memory-mapped
+        """
+
+        mmap_mode = "r" if mmap else None
+        stations, offsets = (
+            np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ("stations", "offsets")
+        )
+        names = np.load(os.path.join(directory, "names.npy"))
+
+        return cls(stations, offsets, names)
+
+
+def as_surveys(incumbent_wells):
+    """A WellSurveyStore of incumbent wells given as a store or a pd.DataFrame."""
+
+    if isinstance(incumbent_wells, WellSurveyStore):
+        return incumbent_wells
+
+    return WellSurveyStore.from_wells(incumbent_wells)
@@ -0,0 +1,236 @@
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from geofeatures.optimizer import init_worker, min_distances
+from geofeatures.trajectory import TrajectoryBatch, is_feasible
+
+with open("config.json") as f:
+    settings = json.load(f)
+
+
+def _values(range_):
+    """Parameter values from (start, stop, num) or an explicit list."""
+
+    if isinstance(range_, tuple):
+        start, stop, num = range_
+        return np.linspace(start, stop, int(num))
+    return np.atleast_1d(np.asarray(range_, dtype=float))
+
+
+def _write_chunk(
+    filename: str,
+    runs: pd.DataFrame,
+    coordinates,
+    casing_split_indices,
+    min_distance,
+    nearest_well,
+):
+    """Writes one chunk of runs as a Parquet file."""
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Sweeps are written with pyarrow: pip install pyarrow") from e
+
+    # Only the stations of each run, without the padding of TrajectoryBatch
+    no_of_stations = 2 * TrajectoryBatch.LEG_LEN + runs["dip"].to_numpy() - 1
+    offsets = np.r_[0, np.cumsum(no_of_stations)].astype(np.int32)
+    is_station = np.arange(coordinates.shape[1]) < no_of_stations[:, None]
+
+    columns = {key: pa.array(runs[key].to_numpy()) for key in runs.columns}
+    columns["casing_index"] = pa.array(casing_split_indices, type=pa.int64())
+    for axis, key in enumerate(("x", "y", "z")):
+        columns[key] = pa.ListArray.from_arrays(
+            pa.array(offsets), pa.array(coordinates[..., axis][is_station])
+        )
+    columns["min_distance"] = pa.array(
+        min_distance, type=pa.float64(), from_pandas=True
+    )
+    columns["nearest_well"] = pa.array(nearest_well, type=pa.string())
+
+    pq.write_table(pa.table(columns), filename)
+
+
+def run_chunk(task):
+    """Runs and writes one chunk of the parameter grid.
+
+    Runs whose parameters are not feasible, see trajectory.is_feasible,
+    are left out.
+
+    Args:
+        task (tuple): (filename, runs), runs being a pd.DataFrame of
+            trajectory parameters with the grid index as "run"
+
+    Returns:
+        filename (str): The written file
+    """
+
+    filename, runs = task
+    runs = runs[is_feasible(runs)].reset_index(drop=True)
+    if runs.empty:
+        coordinates = np.empty((0, 2 * TrajectoryBatch.LEG_LEN, 3))
+        casing_split_indices = np.empty(0, dtype=int)
+    else:
+        coordinates, casing_split_indices = TrajectoryBatch(runs).assemble()
+    min_distance, nearest_well = min_distances(coordinates)
+
+    tmp_filename = f"{filename}.tmp"
+    _write_chunk(
+        tmp_filename,
+        runs,
+        coordinates,
+        casing_split_indices,
+        min_distance,
+        nearest_well,
+    )
+    os.replace(tmp_filename, filename)
+
+    return filename
+
+
+class Sweep:
+    """A parallel parameter sweep over a grid of trajectory parameters.
+
+    The grid is the Cartesian product of the given ranges, with the
+    remaining parameters fixed. It is split into chunks that worker
+    processes assemble with TrajectoryBatch, measure with Distance and
+    write to Parquet, one file per chunk:
+
+        output_dir/part-00000.parquet, ...
+
+    Each file has the parameters of its runs (and their grid index
+    "run"), the casing split index, the x, y and z of every station as
+    lists, the minimum distance to any incumbent well (min_distance) and
+    the name of that well (nearest_well). Both are null where no well is
+    within max_distance. Infeasible runs are left out, see
+    trajectory.is_feasible. Nothing is plotted.
+
+    Files that already exist are skipped, so an interrupted sweep
+    picks up where it left off. What the sweep covers is written to
+    output_dir/_manifest.json, which Parquet readers skip, and a
+    different sweep won't resume in the same directory.
+
+    Attributes:
+        ranges (dict): Values for any of the default_values, either a
+            (start, stop, num) tuple or a list of values
+        incumbent_wells: Incumbent wells, see Distance
+        output_dir (str): Directory for the Parquet files
+        parameters (dict, optional): Fixed parameters.
+            Defaults to default_values in config.json
+        max_distance (float, optional): Pruning distance.
+            Defaults to max_distance in config.json
+    """
+
+    def __init__(
+        self,
+        ranges: dict,
+        incumbent_wells,
+        output_dir: str,
+        parameters: dict = None,
+        max_distance: float = None,
+    ):
+        self.parameters = dict(parameters or settings["default_values"])
+        self.grid = {key: _values(range_) for key, range_ in ranges.items()}
+        self.shape = tuple(len(values) for values in self.grid.values())
+        self.incumbent_wells = incumbent_wells
+        self.output_dir = output_dir
+        if max_distance is None:
+            max_distance = settings["max_distance"]
+        self.max_distance = max_distance
+
+    def __len__(self):
+        return int(np.prod(self.shape))
+
+    def runs(self, start: int, stop: int):
+        """Parameters of grid points start to stop, without building the grid."""
+
+        run = np.arange(start, stop)
+        runs = pd.DataFrame(
+            {key: np.full(len(run), val) for key, val in self.parameters.items()}
+        )
+        for key, grid_index in zip(self.grid, np.unravel_index(run, self.shape)):
+            runs[key] = self.grid[key][grid_index]
+        runs["dip"] = np.round(runs["dip"]).astype(int)
+        runs.insert(0, "run", run)
+
+        return runs
+
+    def _tasks(self, chunk_size: int):
+        for chunk, start in enumerate(range(0, len(self), chunk_size)):
+            filename = os.path.join(self.output_dir, f"part-{chunk:05d}.parquet")
+            if not os.path.exists(filename):
+                yield filename, self.runs(start, min(start + chunk_size, len(self)))
+
+    def _check_manifest(self, chunk_size: int):
+        """Writes the manifest, or checks that it's the same sweep.
+
+        Raises:
+            ValueError: If output_dir holds chunks of another sweep
+        """
+
+        manifest = dict(
+            grid={key: values.tolist() for key, values in self.grid.items()},
+            parameters=self.parameters,
+            max_distance=self.max_distance,
+            chunk_size=chunk_size,
+            runs=len(self),
+        )
+        manifest = json.loads(json.dumps(manifest))
+        filename = os.path.join(self.output_dir, "_manifest.json")
+        if os.path.exists(filename):
+            with open(filename) as f:
+                is_same_sweep = json.load(f) == manifest
+        else:
+            is_same_sweep = not any(
+                name.startswith("part-") for name in os.listdir(self.output_dir)
+            )
+        if not is_same_sweep:
+            raise ValueError(
+                f"{self.output_dir} holds another sweep, resume it with the same "
+                "ranges, parameters and chunk_size or use another output_dir"
+            )
+
+        with open(filename, "w") as f:
+            json.dump(manifest, f, indent=4)
+
+    def run(self, chunk_size=1000, max_workers=None):
+        """High-level method for the sweep.
+
+        Chunks are generated as the pool takes them, with at most two per
+        worker waiting, so the grid is never built in memory.
+
+        Args:
+            chunk_size (int, optional): Runs per file. Defaults to 1000
+            max_workers (int, optional): Size of the process pool.
+                Defaults to the number of cores
+
+        Returns:
+            filenames (list): The files written in this call, sorted
+        """
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._check_manifest(chunk_size)
+        max_workers = max_workers or os.cpu_count()
+        filenames, pending = [], set()
+
+        def collect(futures):
+            filenames.extend(future.result() for future in futures)
+
+        with ProcessPoolExecutor(
+            max_workers,
+            initializer=init_worker,
+            initargs=(self.incumbent_wells, self.max_distance),
+        ) as pool:
+            for task in self._tasks(chunk_size):
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(pool.submit(run_chunk, task))
+            collect(wait(pending).done)
+
+        return sorted(filenames)
@@ -1,6 +1,7 @@
 import os
 import sys
 import warnings
+from collections import OrderedDict
 
 import numpy as np
 
@@ -9,7 +10,7 @@ pwd = os.getcwd()
 sys.path.insert(0, pwd)
 
 from coordinate_conversion import Conversion
-
+from geofeatures.ground import ground_elevation
 
 class Trigonometrics:
     """Degree-based trigonometric functions just b/c"""
@@ -61,6 +62,37 @@ def get_index(a, b):
     return sum(a < b)
 
 
+def is_feasible(parameters, max_mmd=np.inf, max_bu=np.inf):
+    """Whether trajectory parameters leave room for every leg.
+
+    The build-up leg needs a dip of at least 2 degrees and a positive
+    build-up rate, and the slanted leg the depth that remains.
+
+    Args:
+        parameters (dict or pd.DataFrame): mmd, kop, dip and bu,
+            as scalars or one value per trajectory
+        max_mmd (float, optional): Upper limit on measured depth
+        max_bu (float, optional): Upper limit on build-up rate
+
+    Returns:
+        (bool or np.array): Feasibility of each trajectory
+    """
+
+    mmd, kop, dip, bu = (
+        np.asarray(parameters[key], dtype=float) for key in ("mmd", "kop", "dip", "bu")
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slanted_leg_len = mmd - kop - dip / bu
+
+    return (
+        (mmd <= max_mmd)
+        & (bu > 0)
+        & (bu <= max_bu)
+        & (dip >= 2)
+        & (slanted_leg_len > 0)
+    )
+
+
 class Trajectory2d:
 
     """Generates 2D-trajectory of proposed well.
@@ -72,23 +104,29 @@ class Trajectory2d:
 
     Attributes:
         parameters: The well trajectory parameters.
-            See default_values in config.json 
+            See default_values in config.json. A missing (or None) Z
+            is taken as the ground elevation at the wellhead
+        ground (GroundElevation, optional): Where to look up Z.
+            Defaults to the geothermal_area in config.json
     """
 
-    def __init__(self, parameters: dict):
+    def __init__(self, parameters: dict, ground=None):
         self.MMD = parameters["mmd"]
         self.DIP = parameters["dip"]
-        self.Z = parameters["Z"]
         self.AZ = parameters["az"]
         self.CD = parameters["cd"]
         self.KOP = parameters["kop"]
         self.BU = parameters["bu"]
         if parameters["X"] < 300_000:
             conversion_ = Conversion()
-            self.X, self.Y = conversion_.wgs_to_isn(parameters["X", "Y"])
+            self.X, self.Y = conversion_.wgs_to_isn(parameters["X"], parameters["Y"])
         else:
             self.X = parameters["X"]
             self.Y = parameters["Y"]
+        self.Z = parameters.get("Z")
+        if self.Z is None:
+            ground = ground or ground_elevation()
+            self.Z = float(ground.at(self.X, self.Y))
 
     def _get_casing_split(self):
         """Finds the well trajectory index of the casing split.
@@ -206,34 +244,99 @@ class Trajectory2d:
         return r_total, z_total, casing_split_index
 
 
+class ProfileCache:
+    """A least-recently-used cache of assembled 2D profiles.
+
+    The r/z profile and casing split index only depend on the parameters
+    in PROFILE_KEYS, so changing the azimuth or wellhead position can
+    reuse a profile assembled earlier. The cached arrays are read-only
+    as they're shared between trajectories.
+
+    Attributes:
+        maxsize (int, optional): Number of profiles kept. Defaults to 128
+    """
+
+    PROFILE_KEYS = ("mmd", "dip", "Z", "cd", "kop", "bu")
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.profiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, parameters: dict):
+        """Returns r, z and casing split index, assembling them on a miss.
+
+        Args:
+            parameters (dict): The well trajectory parameters.
+                See default_values in config.json
+
+        Returns:
+            See Trajectory2d.assemble()
+        """
+
+        key = tuple(parameters[key] for key in self.PROFILE_KEYS)
+        if key in self.profiles:
+            self.hits += 1
+            self.profiles.move_to_end(key)
+            return self.profiles[key]
+
+        self.misses += 1
+        r, z, casing_split_index = Trajectory2d(parameters).assemble()
+        r.setflags(write=False)
+        z.setflags(write=False)
+        self.profiles[key] = r, z, casing_split_index
+        if len(self.profiles) > self.maxsize:
+            self.profiles.popitem(last=False)
+
+        return self.profiles[key]
+
+    def clear(self):
+        self.profiles.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+profile_cache = ProfileCache()
+
+
 class Trajectory3d(Trajectory2d):
     """Generates a 3D trajectory by extrapolating from 2D trajectory.
 
     What it does is splitting the r-values from the Trajectory2d class
-    into x and y components by considering the azimuth.
+    into x and y components by considering the azimuth. The 2D profile
+    comes from a ProfileCache, so only forking is repeated when the
+    azimuth or wellhead change.
 
     Args:
         Trajectory2d (class instance): 2D well trajectory
+        cache (ProfileCache, optional): Defaults to the module's profile_cache
+        ground (GroundElevation, optional): See Trajectory2d
     """
 
-    def __init__(self, parameters):
-        super().__init__(parameters)
-        self.r, self.z, self.casing_split_index = super().assemble()
+    def __init__(self, parameters, cache=profile_cache, ground=None):
+        super().__init__(parameters, ground)
+        self.r, self.z, self.casing_split_index = cache.get(dict(parameters, Z=self.Z))
 
-    def _get_delta(self, r):
+    def _get_delta(self, r, az):
         """Forks horizontal displacement r into
         x and y components using the azimuth.
 
+        Broadcasts over both arguments, so an array of azimuths of shape
+        (n_az, 1) and an r-array of shape (n_points,) yields deltas of
+        shape (n_az, n_points).
+
         Args:
-            r (float): r component (inherited from super)
+            r (np.array): r component (inherited from super)
+            az (float or np.array): Azimuth in degrees, clockwise from north
 
         Returns:
-            delta_x (float): east/westbound increment
-            delta_y (float): north/southbound increment
+            delta_x (np.array): east/westbound increment
+            delta_y (np.array): north/southbound increment
         """
 
-        delta_y = r / np.sqrt(Trigonometrics.tand(self.AZ) ** 2 + 1)
-        delta_x = delta_y * Trigonometrics.tand(self.AZ)
+        delta_x = r * Trigonometrics.sind(az)
+        delta_y = r * Trigonometrics.cosd(az)
 
         # Only needed when working with WGS84 (lat/lon)
         # M_TO_DEG = 1.11e5  # m to deg on Earth's surface
@@ -243,9 +346,15 @@ class Trajectory3d(Trajectory2d):
 
         return delta_x, delta_y
 
-    def fork_r(self):
+    def fork_r(self, az=None):
         """Forks array r into x and y components.
 
+        Args:
+            az (float or array-like, optional): Azimuth(s) in degrees to fork
+                the 2D profile along. Defaults to the azimuth in parameters.
+                Passing an array of n_az azimuths returns x and y as
+                (n_az, n_points) grids, one row per azimuth.
+
         Returns:
             x (np.array): east/westbound component
             y (np.array): north/southbound component
@@ -255,22 +364,181 @@ class Trajectory3d(Trajectory2d):
                                       see Trajectory2d.get_casing_split()
         """
 
-        x = self.X + np.zeros(len(self.r))
-        y = self.Y + np.zeros(len(self.r))
-
-        # Special cases -> tand(az) = inf
-        if self.AZ == 90 or self.AZ == 270:
-            x += self.r
-            return x, y, self.r, self.z, self.casing_split_index
+        if az is None:
+            az = self.AZ
+        az = np.asarray(az, dtype=float)
+        if az.ndim:
+            az = az.reshape(-1, 1)
 
-        for i, r in enumerate(self.r):
-            delta_x, delta_y = self._get_delta(r)
-            # Must consider which quadrant we're in
-            if 90 < self.AZ <= 270:
-                y[i] -= delta_y
-                x[i] -= delta_x
-            else:
-                y[i] += delta_y
-                x[i] += delta_x
+        delta_x, delta_y = self._get_delta(self.r, az)
+        x = self.X + delta_x
+        y = self.Y + delta_y
 
         return x, y, self.r, self.z, self.casing_split_index
+
+
+class TrajectoryBatch:
+    """Generates many 3D trajectories at once, without a per-well loop.
+
+    The legs are the same as in Trajectory2d, only built for every
+    parameter set simultaneously with array operations. Since the
+    build-up leg has dip-1 stations, wells of different dip don't have
+    the same number of stations. Shorter wells are therefore padded at
+    the bottom by repeating their last station, so that each row agrees
+    with Trajectory3d.fork_r() up to its own length and the casing split
+    indices are the same as for a single well.
+
+    Attributes:
+        parameters: Columnar well trajectory parameters, e.g. a dict of
+            arrays or a pd.DataFrame with the keys of default_values in
+            config.json. Scalars are broadcast. X and Y must be in ISN93.
+            Missing or NaN values of Z are looked up in ground, so a batch
+            of wellhead locations gets the elevation of each
+        ground (GroundElevation, optional): Defaults to the
+            geothermal_area in config.json
+    """
+
+    KEYS = ("X", "Y", "mmd", "dip", "Z", "az", "cd", "kop", "bu")
+    LEG_LEN = 50  # Length of the vertical and slanted linspaces
+
+    def __init__(self, parameters, ground=None):
+        values = {key: parameters[key] for key in self.KEYS if key in parameters}
+        if values.get("Z") is None:
+            values["Z"] = np.nan
+        columns = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(values[key])) for key in self.KEYS)
+        )
+        (
+            self.X,
+            self.Y,
+            self.MMD,
+            self.DIP,
+            self.Z,
+            self.AZ,
+            self.CD,
+            self.KOP,
+            self.BU,
+        ) = (column.astype(float) for column in columns)
+        self.DIP = self.DIP.astype(int)
+        is_missing = np.isnan(self.Z)
+        if is_missing.any():
+            ground = ground or ground_elevation()
+            self.Z = np.where(is_missing, ground.at(self.X, self.Y), self.Z)
+        self.n_buildup = self.DIP - 1  # Stations in each build-up leg
+
+    def __len__(self):
+        return len(self.MMD)
+
+    def _vertical_legs(self):
+        z_vertical = np.linspace(-self.Z, self.KOP - self.Z, self.LEG_LEN, axis=-1)
+
+        return np.zeros_like(z_vertical), z_vertical
+
+    def _buildup_legs(self):
+        """Build-up legs padded to the longest one in the batch.
+
+        Returns:
+            r_buildup (np.array): (N, max(dip)-1) horizontal displacement
+            z_buildup (np.array): (N, max(dip)-1) vertical displacement
+            len_buildup (np.array): (N, max(dip)-1) see Trajectory2d
+        """
+
+        steps = np.arange(1, self.n_buildup.max())
+        # Degrees past the well's own dip-2 add nothing, i.e. padding
+        is_step = steps < self.n_buildup[:, None]
+        step_len = is_step / self.BU[:, None]
+
+        def cumulative(increments):
+            zeros = np.zeros((len(self), 1))
+            return np.concatenate((zeros, np.cumsum(increments, axis=1)), axis=1)
+
+        end_z_vertical = (self.KOP - self.Z)[:, None]
+        r_buildup = cumulative(Trigonometrics.sind(steps) * step_len)
+        z_buildup = end_z_vertical + cumulative(Trigonometrics.cosd(steps) * step_len)
+        len_buildup = end_z_vertical + cumulative(step_len)
+
+        return r_buildup, z_buildup, len_buildup
+
+    def _slanted_legs(self, end_r_buildup, end_z_buildup):
+        slanted_leg_len = self.MMD - self.KOP - self.DIP / self.BU
+        r_slanted = np.linspace(
+            end_r_buildup,
+            end_r_buildup + slanted_leg_len * Trigonometrics.sind(self.DIP),
+            self.LEG_LEN,
+            axis=-1,
+        )
+        z_slanted = end_z_buildup[:, None] + np.linspace(
+            0, slanted_leg_len * Trigonometrics.cosd(self.DIP), self.LEG_LEN, axis=-1
+        )
+        len_slanted = z_slanted / Trigonometrics.cosd(self.DIP)[:, None]
+
+        return r_slanted, z_slanted, len_slanted
+
+    def _get_casing_splits(self, z_vertical, len_buildup, len_slanted):
+        """Vectorized counterpart of Trajectory2d._get_casing_split().
+
+        Returns:
+            split_indices (np.array): (N,) casing split index of each well
+        """
+
+        shifted_cd = (self.CD - self.Z)[:, None]
+        end_len_buildup = np.take_along_axis(
+            len_buildup, self.n_buildup[:, None] - 1, axis=1
+        )[:, 0]
+
+        first_leg = np.sum(z_vertical < shifted_cd, axis=1)
+        # Padded build-up stations repeat the last one and mustn't be counted
+        is_station = np.arange(len_buildup.shape[1]) < self.n_buildup[:, None]
+        second_leg = np.sum((len_buildup < shifted_cd) & is_station, axis=1)
+        third_leg = self.n_buildup + np.sum(len_slanted < shifted_cd, axis=1)
+
+        split_indices = np.where(
+            self.CD <= self.KOP,
+            first_leg,
+            np.where(self.CD < end_len_buildup, second_leg, third_leg) + self.LEG_LEN,
+        )
+
+        return split_indices
+
+    def assemble(self):
+        """Concatenates the three legs of every well and forks them in 3D.
+
+        Returns:
+            coordinates (np.array): (N, M, 3) x, y and z of every station,
+                where M = 2*50 + max(dip) - 1
+            casing_split_indices (np.array): (N,) casing split indices
+        """
+
+        r_vertical, z_vertical = self._vertical_legs()
+        r_buildup, z_buildup, len_buildup = self._buildup_legs()
+        last_buildup = self.n_buildup[:, None] - 1
+        r_slanted, z_slanted, len_slanted = self._slanted_legs(
+            np.take_along_axis(r_buildup, last_buildup, axis=1)[:, 0],
+            np.take_along_axis(z_buildup, last_buildup, axis=1)[:, 0],
+        )
+
+        r_padded = np.concatenate((r_vertical, r_buildup, r_slanted), axis=1)
+        z_padded = np.concatenate((z_vertical, z_buildup, z_slanted), axis=1)
+
+        # Move each slanted leg up against its own build-up leg,
+        # repeating the last station to fill the space left at the bottom
+        n_stations = r_padded.shape[1]
+        columns = np.arange(n_stations)
+        end_of_buildup = self.LEG_LEN + self.n_buildup[:, None]
+        padding = n_stations - 2 * self.LEG_LEN - self.n_buildup[:, None]
+        source = np.where(
+            columns < end_of_buildup,
+            columns,
+            np.minimum(columns + padding, n_stations - 1),
+        )
+        r = np.take_along_axis(r_padded, source, axis=1)
+        z = np.take_along_axis(z_padded, source, axis=1)
+
+        x = self.X[:, None] + r * Trigonometrics.sind(self.AZ)[:, None]
+        y = self.Y[:, None] + r * Trigonometrics.cosd(self.AZ)[:, None]
+        coordinates = np.stack((x, y, z), axis=-1)
+        casing_split_indices = self._get_casing_splits(
+            z_vertical, len_buildup, len_slanted
+        )
+
+        return coordinates, casing_split_indices
@@ -0,0 +1,213 @@
+import json
+import numpy as np
+
+from geofeatures.distance import Distance, interpolate_rows
+
+with open("config.json") as f:
+    settings = json.load(f)
+error_model = settings["position_uncertainty"]
+
+
+def _normalize(v):
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.where(norm > 0, norm, 1.0)
+
+
+def well_geometry(stations: np.array):
+    """Measured depth, horizontal throw and along-hole direction of stations.
+
+    Args:
+        stations (np.array): (..., K, 3) station coordinates
+
+    Returns:
+        md (np.array): (..., K) measured depth from the first station
+        throw (np.array): (..., K) horizontal distance from the first station
+        along (np.array): (..., K, 3) unit vectors along the well
+    """
+
+    segments = np.diff(stations, axis=-2)
+    md = np.concatenate(
+        (
+            np.zeros(stations.shape[:-2] + (1,)),
+            np.cumsum(np.linalg.norm(segments, axis=-1), axis=-1),
+        ),
+        axis=-1,
+    )
+    throw = np.linalg.norm(stations[..., :2] - stations[..., :1, :2], axis=-1)
+    along = _normalize(np.gradient(stations, axis=-2))
+
+    return md, throw, along
+
+
+def covariances(md, throw, along, error_model: dict = error_model):
+    """Positional covariance from measured depth, throw and direction.
+
+    A simplified systematic error model in which errors grow linearly
+    with measured depth (MD):
+
+    - surface: wellhead position error [m], horizontal
+    - inclination: tool misalignment [deg], perpendicular to the well
+    - azimuth: azimuth error [deg], lateral, scaled by horizontal throw
+    - depth: relative depth error [m/m], along the well
+
+    The standard deviations are set up in the frame of the well
+    (high side, lateral, along-hole) and rotated to x, y, z for all
+    points of all wells at once.
+
+    Args:
+        md, throw, along: See well_geometry()
+        error_model (dict, optional): See position_uncertainty in config.json
+
+    Returns:
+        (np.array): (..., 3, 3) covariance matrices
+    """
+
+    along = np.where(np.isnan(along), [0, 0, 1], along)
+    lateral = np.cross([0, 0, 1], along)
+    is_vertical = np.linalg.norm(lateral, axis=-1, keepdims=True) < 1e-9
+    lateral = _normalize(np.where(is_vertical, [1, 0, 0], lateral))
+    high_side = np.cross(along, lateral)
+    rotation = np.stack((high_side, lateral, along), axis=-1)
+
+    sigma_inclination = md * np.deg2rad(error_model["inclination"])
+    sigma_azimuth = throw * np.deg2rad(error_model["azimuth"])
+    variances = np.stack(
+        (
+            sigma_inclination**2,
+            sigma_inclination**2 + sigma_azimuth**2,
+            (md * error_model["depth"]) ** 2,
+        ),
+        axis=-1,
+    )
+    covariances_ = np.einsum("...ij,...j,...kj->...ik", rotation, variances, rotation)
+    covariances_[..., 0, 0] += error_model["surface"] ** 2
+    covariances_[..., 1, 1] += error_model["surface"] ** 2
+
+    return covariances_
+
+
+def station_covariances(stations: np.array, error_model: dict = error_model):
+    """Positional covariance at every station of one or more wells.
+
+    Args:
+        stations (np.array): (..., K, 3) station coordinates
+        error_model (dict, optional): See position_uncertainty in config.json
+
+    Returns:
+        (np.array): (..., K, 3, 3) covariance matrices, see covariances()
+    """
+
+    return covariances(*well_geometry(stations), error_model)
+
+
+class SeparationFactor(Distance):
+    """Separation factor between the proposed well and incumbent wells.
+
+    Pairs the wells at equal depth like Distance, but divides the
+    centre-to-centre distance by the combined positional uncertainty
+    of both wells in that direction:
+
+        SF = distance / (sigma * sqrt(u^T (C_proposed + C_incumbent) u))
+
+    where u is the unit vector between the wells. SF < 1 means the
+    uncertainty ellipsoids (at sigma standard deviations) overlap.
+
+    Attributes:
+        See Distance
+        error_model (dict, optional): See position_uncertainty
+            in config.json
+    """
+
+    def __init__(
+        self,
+        incumbent_wells,
+        proposed_well,
+        index=None,
+        max_distance=None,
+        error_model=error_model,
+    ):
+        super().__init__(incumbent_wells, proposed_well, index, max_distance)
+        self.error_model = error_model
+
+    def _separation_factors(self, xy, z):
+        # The geometry of the incumbents, not their covariance, is
+        # interpolated to the proposed depths as variance grows with md^2
+        stations = np.concatenate((xy, z[..., None]), axis=-1)
+        md, throw, along = well_geometry(stations)
+        geometry = interpolate_rows(
+            self.proposed_well[:, 2],
+            z,
+            np.concatenate((md[..., None], throw[..., None], along), axis=-1),
+        )
+        covariances_incumbent = covariances(
+            geometry[..., 0],
+            geometry[..., 1],
+            _normalize(geometry[..., 2:]),
+            self.error_model,
+        )
+        covariances_proposed = station_covariances(self.proposed_well, self.error_model)
+
+        xy_interp = interpolate_rows(self.proposed_well[:, 2], z, xy)
+        delta = xy_interp - self.proposed_well[None, :, :2]
+        distances = np.hypot(delta[..., 0], delta[..., 1])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            direction = np.concatenate(
+                (delta / distances[..., None], np.zeros(distances.shape + (1,))),
+                axis=-1,
+            )
+        # Wells on top of each other have no direction, any will do
+        direction = np.where(np.isnan(direction), [1, 0, 0], direction)
+
+        variance = np.einsum(
+            "nmi,nmij,nmj->nm",
+            direction,
+            covariances_proposed[None] + covariances_incumbent,
+            direction,
+        )
+        with np.errstate(invalid="ignore"):
+            separation_factors = distances / (
+                self.error_model["sigma"] * np.sqrt(variance)
+            )
+
+        return distances, separation_factors
+
+    def run(self):
+        """High-level method for calculating separation factors.
+
+        The dense (n_wells, M) distances and separation factors
+        are kept as self.distances and self.separation_factors.
+
+        Returns:
+            separation_factors (dict): Each key-value pair contains the
+                separation factor between an incumbent well (identified by
+                key) and the proposed well at every z-step of the proposed
+                well where their depths overlap
+        """
+
+        rows = np.flatnonzero(self._candidates())
+        self.distances = self._dense(rows, np.nan)
+        self.separation_factors = self._dense(rows, np.nan)
+        for positions, xy, z in self._blocks(rows):
+            (
+                self.distances[rows[positions]],
+                self.separation_factors[rows[positions]],
+            ) = self._separation_factors(xy, z)
+
+        return self._to_dict(self.separation_factors)
+
+    def update(self, proposed_well):
+        """Recalculates separation factors for a changed proposed well.
+
+        The uncertainty of every station depends on the path above it, so
+        unlike Distance.update() nothing is reused and this is run().
+
+        Args:
+            proposed_well (np.array): (M, 3) coordinates of the proposed well
+
+        Returns:
+            separation_factors (dict): See run()
+        """
+
+        self.proposed_well = proposed_well
+
+        return self.run()
@@ -1,5 +1,11 @@
 import json
+import os
+import time
+import warnings
+
+import numpy as np
 import pandas as pd
+import requests
 
 with open("config.json") as f:
     settings = json.load(f)
@@ -9,8 +15,39 @@ locations = settings["locations_bbox"]
 class OpenSourceWells:
     """Downloads, processes, and saves the (open-source)
     coordinates of all wellheads in Reykjanes.
+
+    load() is the streaming path: the registry is read in chunks, only
+    the needed columns with compact dtypes, and filtered to the area as
+    it streams. The result is cached per area as Parquet, together with
+    a signature of the source, and only read again when the source
+    changes. Without a registry, load() reads the bundled wells_filename.
+
+    Attributes:
+        area (str, optional): Defaults to geothermal_area in config.json
+        source (str, optional): URL or path of the registry. Defaults to
+            borholuskra in config.json if remote_wells is set, else None
+        cache_dir (str, optional): Where the cache is kept. Defaults to data
     """
 
+    # Cache age [s] after which a source without validators is read again
+    MAX_CACHE_AGE = 24 * 60 * 60
+
+    DTYPES = {
+        "Borholunofn": str,
+        "x": np.float64,
+        "y": np.float64,
+        "MaxFDypi": np.float32,
+        "SVAEDISNAFN": "category",
+    }
+
+    def __init__(self, area: str = None, source: str = None, cache_dir: str = "data"):
+        self.area = area or settings["geothermal_area"]
+        if source is None and settings["remote_wells"]:
+            source = settings["borholuskra"]
+        self.source = source
+        self.cache_filename = os.path.join(cache_dir, f"wells-{self.area}.parquet")
+        self.signature_filename = os.path.join(cache_dir, f"wells-{self.area}.json")
+
     def download(self):
         """Downloads dataset from LMÍ.
 
@@ -55,4 +92,138 @@ class OpenSourceWells:
         return wells
 
     def save(self, wells: pd.DataFrame):
-        wells.to_csv(settings["wells_filename"], index=False)
\ No newline at end of file
+        wells.to_csv(settings["wells_filename"], index=False)
+
+    def stream(self, chunksize: int = 100_000):
+        """Reads the wells of the area from the registry, chunk by chunk.
+
+        Only chunksize rows of the registry are in memory at a time.
+
+        Args:
+            chunksize (int, optional): Rows per chunk. Defaults to 100 000
+
+        Returns:
+            (pd.DataFrame): See process()
+        """
+
+        chunks = pd.read_csv(
+            self.source,
+            usecols=list(self.DTYPES),
+            dtype=self.DTYPES,
+            chunksize=chunksize,
+        )
+        wells_raw = pd.concat(
+            [chunk[chunk["SVAEDISNAFN"] == self.area] for chunk in chunks],
+            ignore_index=True,
+        )
+
+        return self.process(wells_raw).reset_index(drop=True)
+
+    def _source_signature(self):
+        """Identifies the version of the source without reading it.
+
+        Returns:
+            (dict): Size and modification time of a local file, or the
+                validators of a URL. None if the source can't be reached
+        """
+
+        if os.path.exists(self.source):
+            stat = os.stat(self.source)
+            return dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        try:
+            response = requests.head(self.source, allow_redirects=True, timeout=10)
+            response.raise_for_status()
+        except requests.RequestException:
+            return None
+        headers = ("ETag", "Last-Modified", "Content-Length")
+
+        return {key: response.headers.get(key) for key in headers}
+
+    def _is_cache_current(self, signature: dict, cached_signature: dict):
+        """Whether the cache holds the current version of the source."""
+
+        if cached_signature is None:
+            return False
+        if signature is None:
+            # Offline, the cache is as current as it gets
+            return True
+        if any(value is not None for value in signature.values()):
+            return signature == cached_signature
+        # Without validators the version is unknown, so the cache expires
+        age = time.time() - os.path.getmtime(self.cache_filename)
+
+        return age < self.MAX_CACHE_AGE
+
+    def _cached_signature(self):
+        if not (
+            os.path.exists(self.cache_filename)
+            and os.path.exists(self.signature_filename)
+        ):
+            return None
+        with open(self.signature_filename) as f:
+            cached = json.load(f)
+        if cached["source"] != self.source:
+            return None
+
+        return cached["signature"]
+
+    def read_local(self):
+        """The wells in wells_filename in config.json, see save().
+
+        Returns:
+            (pd.DataFrame): See process()
+
+        Raises:
+            FileNotFoundError: If wells_filename doesn't exist
+        """
+
+        if not os.path.exists(settings["wells_filename"]):
+            raise FileNotFoundError(
+                f"{settings['wells_filename']} doesn't exist, run setup.py to "
+                "fetch the wells or set remote_wells in config.json"
+            )
+
+        return pd.read_csv(
+            settings["wells_filename"],
+            dtype={
+                key: dtype for key, dtype in self.DTYPES.items() if key != "SVAEDISNAFN"
+            },
+        )
+
+    def load(self, chunksize: int = 100_000):
+        """The wells of the area, from the cache unless the source changed.
+
+        Without a source the wells are read from wells_filename in
+        config.json, and nothing is fetched. Offline, the cache is used
+        as is, and without a cache either, wells_filename.
+
+        Args:
+            chunksize (int, optional): See stream()
+
+        Returns:
+            (pd.DataFrame): See process()
+
+        Raises:
+            FileNotFoundError: If wells_filename is needed but doesn't exist
+        """
+
+        if self.source is None:
+            return self.read_local()
+
+        signature = self._source_signature()
+        if self._is_cache_current(signature, self._cached_signature()):
+            return pd.read_parquet(self.cache_filename)
+
+        if signature is None:
+            warnings.warn(
+                f"{self.source} can't be reached, "
+                f"reading wells from {settings['wells_filename']}"
+            )
+            return self.read_local()
+
+        wells = self.stream(chunksize)
+        wells.to_parquet(self.cache_filename, index=False)
+        with open(self.signature_filename, "w") as f:
+            json.dump(dict(source=self.source, signature=signature), f)
+
+        return wells
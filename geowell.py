@@ -8,18 +8,50 @@ Usage:
 
 Example:
     > python geowell.py --az=300
+
+    With --Z=None the wellhead elevation is looked up in the
+    elevation data, see geofeatures/ground.py
+
+Commands:
+    > python geowell.py optimize --az="(0, 360)" --kop="(300, 800)"
+
+    searches within the given bounds for the trajectories that keep
+    furthest from incumbent wells, see geofeatures/optimizer.py
+
+    > python geowell.py sweep --az="(0, 360, 73)" --dip="[10, 20, 30]"
+
+    runs every combination of the given (start, stop, num) ranges or
+    lists on all cores and writes the results to Parquet files without
+    plotting, see geofeatures/sweep.py
+
+    > python geowell.py clearance --output_dir=data/clearance
+
+    writes the minimum clearance between every pair of incumbent wells,
+    and its depth, as sparse matrices, see geofeatures/clearance.py
+
+    > python geowell.py interactive --az=300
+
+    opens the plots with a slider and a text box for each parameter.
+    Only the trajectory and the distances are redrawn on a change
 """
 
+import sys
+
 import fire
 import json
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import warnings
 
+from geofeatures.clearance import FieldClearance
 from geofeatures.distance import Distance
+from geofeatures.grid import ElevationPyramid
+from geofeatures.optimizer import Optimizer
+from geofeatures.spatial import WellIndex
+from geofeatures.sweep import Sweep
 from geofeatures.trajectory import Trajectory3d
-from plots import GUI
+from geofeatures.wells import OpenSourceWells
+from plots import GUI, InteractiveGUI
 
 # Suppressing an obnoxious mapping plotting warning
 warnings.filterwarnings("ignore", category=RuntimeWarning)
@@ -29,6 +61,30 @@ with open("config.json") as f:
 parameters = settings["default_values"]
 
 
+def area_elevation(extent=None):
+    """Elevation at the finest level that fits the mesh budget over an extent.
+
+    Args:
+        extent (tuple, optional): (xmin, xmax, ymin, ymax), clipped to the
+            geothermal_area. Defaults to the whole area
+
+    Returns:
+        (ElevationGrid): See ElevationPyramid.query()
+    """
+
+    area = settings["geothermal_area"]
+    bbox = settings["locations_bbox"][area]
+    area_extent = (bbox["ulx"], bbox["lrx"], bbox["lry"], bbox["uly"])
+    if extent is not None:
+        xmin, xmax = max(extent[0], area_extent[0]), min(extent[1], area_extent[1])
+        ymin, ymax = max(extent[2], area_extent[2]), min(extent[3], area_extent[3])
+        if xmin < xmax and ymin < ymax:
+            area_extent = (xmin, xmax, ymin, ymax)
+    pyramid = ElevationPyramid.load(f"data/{area}.pyramid")
+
+    return pyramid.query(area_extent, settings["MESH_RESOLUTION"] ** 2)
+
+
 def geowell(**custom_params):
     for parameter, value in custom_params.items():
         parameters[parameter] = value
@@ -41,28 +97,109 @@ def geowell(**custom_params):
     gui.plot_2d_trajectory(r, z, casing_index)
     gui.plot_3d_trajectory(x, y, z, casing_index)
 
-    # Elevation
-    with open(f"data/Reykjanes.json") as f:
-        elevation_data = json.load(f)
-    gui.plot_elevation_map(elevation_data)
+    # Elevation around the wellpad and trajectory, out to max_distance
+    margin = settings["max_distance"]
+    extent = (x.min() - margin, x.max() + margin, y.min() - margin, y.max() + margin)
+    gui.plot_elevation_map(area_elevation(extent))
 
     # Wells
-    wells_filename = "data/wells.csv"
-    wells_df = pd.read_csv(wells_filename)
-    gui.plot_incumbent_wells(wells_df)
+    incumbent_wells = OpenSourceWells().load()
+    gui.plot_incumbent_wells(incumbent_wells)
 
     # Well distance
-    incumbent_wells = pd.read_csv(settings["wells_filename"])
     proposed_well = np.array((x, y, z)).T
-    distance_ = Distance(incumbent_wells, proposed_well)
-    distances = distance_.run()
-    CASING_DEPTH_ABSOLUTE = z[casing_index] - settings["default_values"]["Z"]
+    index = WellIndex(incumbent_wells)
+    distance_ = Distance(incumbent_wells, proposed_well, index=index)
+    distance_.run()
+    CASING_DEPTH_ABSOLUTE = z[casing_index] - traj_instance.Z
     gui.plot_distances(
-        distances, z, CASING_DEPTH_ABSOLUTE=CASING_DEPTH_ABSOLUTE
+        distance_.distances,
+        distance_.surveys().names,
+        z,
+        CASING_DEPTH_ABSOLUTE=CASING_DEPTH_ABSOLUTE,
+    )
+
+    plt.show()
+
+
+def optimize(
+    n_candidates=2000, n_rounds=3, max_mmd=None, max_bu=None, max_workers=None, **bounds
+):
+    """Prints the Pareto set of clearance against horizontal throw.
+
+    Args:
+        bounds: (low, high) for any of the default_values to search,
+            the rest are kept as in config.json
+        For the rest, see geofeatures.optimizer.Optimizer
+    """
+
+    incumbent_wells = OpenSourceWells().load()
+    optimizer_ = Optimizer(
+        bounds,
+        incumbent_wells,
+        parameters=parameters,
+        max_mmd=max_mmd,
+        max_bu=max_bu,
+        max_workers=max_workers,
     )
+    pareto = optimizer_.run(n_candidates=n_candidates, n_rounds=n_rounds)
+    print(pareto.to_string(index=False))
+
+
+def sweep(output_dir="data/sweep", chunk_size=1000, max_workers=None, **ranges):
+    """Writes a parameter sweep to Parquet files in output_dir.
+
+    Args:
+        ranges: (start, stop, num) or a list of values for any of the
+            default_values, the rest are kept as in config.json
+        For the rest, see geofeatures.sweep.Sweep
+    """
 
+    incumbent_wells = OpenSourceWells().load()
+    sweep_ = Sweep(ranges, incumbent_wells, output_dir, parameters=parameters)
+    sweep_.run(chunk_size=chunk_size, max_workers=max_workers)
+
+
+def clearance(output_dir="data/clearance", max_distance=None, max_workers=None):
+    """Writes the well-to-well clearance matrix of the area to output_dir.
+
+    Args:
+        For all, see geofeatures.clearance.FieldClearance
+    """
+
+    incumbent_wells = OpenSourceWells().load()
+    clearance_ = FieldClearance(
+        incumbent_wells, max_distance=max_distance, max_workers=max_workers
+    )
+    distance, _ = clearance_.run()
+    clearance_.save(output_dir)
+    print(f"{distance.nnz // 2} pairs within {clearance_.max_distance} m")
+
+
+def interactive(**custom_params):
+    """Opens the plots with a slider and a text box for each parameter.
+
+    Args:
+        custom_params: Initial values for any of the default_values
+    """
+
+    for parameter, value in custom_params.items():
+        parameters[parameter] = value
+
+    gui = InteractiveGUI(parameters, OpenSourceWells().load(), area_elevation())
     plt.show()
 
 
+COMMANDS = {
+    "optimize": optimize,
+    "sweep": sweep,
+    "clearance": clearance,
+    "interactive": interactive,
+}
+
+
 if __name__ == "__main__":
-    fire.Fire(geowell)
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        fire.Fire(COMMANDS)
+    else:
+        fire.Fire(geowell)
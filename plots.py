@@ -5,13 +5,50 @@ import matplotlib.pyplot as plt
 import matplotlib.cm
 from matplotlib.font_manager import FontProperties
 from matplotlib.gridspec import GridSpec
+from matplotlib.widgets import Slider, TextBox
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 
+from geofeatures.distance import Distance
+from geofeatures.grid import ElevationGrid
+from geofeatures.spatial import WellIndex
+from geofeatures.surveys import WellSurveyStore
+from geofeatures.trajectory import Trajectory3d, is_feasible
 
 with open("config.json") as f:
     settings = json.load(f)
 
 
+def _fits(ax, x, y):
+    """Whether points are within the current limits of 2D axes."""
+
+    x_min, x_max = sorted(ax.get_xlim())
+    y_min, y_max = sorted(ax.get_ylim())
+
+    return (
+        x_min <= np.min(x)
+        and np.max(x) <= x_max
+        and y_min <= np.min(y)
+        and np.max(y) <= y_max
+    )
+
+
+def _declutter(x: np.array, y: np.array, spacing: float):
+    """Picks one point per spacing-sized square, e.g. to cull labels.
+
+    Returns:
+        (np.array): Positions of the first point in each occupied square
+    """
+
+    cells = np.floor(np.column_stack((x, y)) / spacing)
+    _, first = np.unique(cells, axis=0, return_index=True)
+
+    return np.sort(first)
+
+
 class GUI:
+    # Horizontal distance [m] below which incumbent well labels are culled
+    LABEL_SPACING = 100
+
     def __init__(self):
         plt.rcParams["font.family"] = "monospace"
         self.fig = plt.figure(figsize=(12, 12))
@@ -45,6 +82,9 @@ class GUI:
         self.ax_3d.dist = 8
         self.ax_3d.set_proj_type("ortho")
 
+        # Part of the figure tight_layout() may use
+        self.layout_rect = (0, 0, 1, 1)
+
     def _2d_annotation(self):
         cell_text = list(
             zip(
@@ -80,20 +120,21 @@ class GUI:
         """
 
         self._2d_annotation()
-        self.ax_2d.plot(
+        (casing,) = self.ax_2d.plot(
             r[:i],
             z[:i],
             c=settings["palette"]["blue"],
             linewidth=3,
             solid_capstyle="round",
         )
-        self.ax_2d.plot(
+        (open_hole,) = self.ax_2d.plot(
             r[i - 1 :],
             z[i - 1 :],
             c=settings["palette"]["red"],
             linewidth=3,
             solid_capstyle="round",
         )
+        self.trajectory_2d = casing, open_hole
 
     def plot_3d_trajectory(self, x: np.array, y: np.array, z: np.array, i: int):
         """[summary]
@@ -105,78 +146,360 @@ class GUI:
             i (int): [description]
         """
 
-        self.ax_3d.plot(y[:i], x[:i], z[:i], c=settings["palette"]["blue"])
-        self.ax_3d.plot(
+        (casing,) = self.ax_3d.plot(y[:i], x[:i], z[:i], c=settings["palette"]["blue"])
+        (open_hole,) = self.ax_3d.plot(
             y[i - 1 :],
             x[i - 1 :],
             z[i - 1 :],
             c=settings["palette"]["red"],
             solid_capstyle="round",
         )  # i-1 to ensure overlap w. casing
-        self.ax_3d.text(y[0], x[0], z[0], settings["well_name"], fontweight="bold")
+        self.trajectory_3d = casing, open_hole
+        self.well_label = self.ax_3d.text(
+            y[0], x[0], z[0], settings["well_name"], fontweight="bold"
+        )
 
-    def plot_elevation_map(self, elevation_data: pd.DataFrame):
-        """[summary]
+    def update_trajectory(self, x, y, r, z, i):
+        """Moves the plotted trajectory, see plot_2d/3d_trajectory().
+
+        Returns:
+            (bool): Whether the 2D trajectory still fits the axes limits
+        """
+
+        casing, open_hole = self.trajectory_2d
+        casing.set_data(r[:i], z[:i])
+        open_hole.set_data(r[i - 1 :], z[i - 1 :])
+        casing, open_hole = self.trajectory_3d
+        casing.set_data_3d(y[:i], x[:i], z[:i])
+        open_hole.set_data_3d(y[i - 1 :], x[i - 1 :], z[i - 1 :])
+        self.well_label.set_position_3d((y[0], x[0], z[0]))
+
+        return _fits(self.ax_2d, r, z)
+
+    def plot_elevation_map(self, elevation_data: ElevationGrid):
+        """Plots the elevation surface on the 3D map.
 
         Args:
-            elevation_data ([type]): [description]
+            elevation_data (ElevationGrid): See Process.mesh() or
+                ElevationPyramid.query()
         """
 
-        x = np.array(elevation_data["x"])
-        y = np.array(elevation_data["y"])
-        z = np.array(elevation_data["z"])
+        x, y, z = elevation_data.mesh()
         # Reversed b/c z-axis is reversed
-        cmap = matplotlib.cm.get_cmap("binary_r")
+        cmap = matplotlib.colormaps["binary_r"]
         self.ax_3d.plot_surface(
             y, x, -z, rstride=1, cstride=1, cmap=cmap, linewidth=1, alpha=0.5
         )
 
     def plot_incumbent_wells(self, wells: pd.DataFrame):
-        """Plots a 
+        """Plots the incumbent wells on the 3D map.
+
+        All well paths are one Line3DCollection and all wellheads one
+        scatter, so the map has a few artists however many wells there
+        are. Labels are culled to one per LABEL_SPACING square, see
+        _declutter().
 
         Args:
-            wells (pd.DataFrame): [description]
+            wells (pd.DataFrame): Vertical wells in wells.csv format,
+                drawn from just above ground, or a WellSurveyStore
+                of deviated wells
         """
 
-        x = wells["x"].tolist()
-        y = wells["y"].tolist()
-        z = wells["MaxFDypi"].tolist()
-        name = wells["Borholunofn"].tolist()
-
-        def repeat(val):
-            return np.repeat(val, 50)
-
-        for j in range(len(x)):
-            x_linspace = repeat(x[j])
-            y_linspace = repeat(y[j])
-            z_linspace = np.linspace(-20, z[j])
-            self.ax_3d.scatter(y[j], x[j], -20, c="k", s=3)
-            self.ax_3d.plot(
-                y_linspace, x_linspace, z_linspace, c="k", solid_capstyle="round"
+        if isinstance(wells, WellSurveyStore):
+            paths = [well[:, [1, 0, 2]] for well in wells]
+            names = wells.names
+        else:
+            x, y, z = (
+                wells[key].to_numpy(dtype=float) for key in ("x", "y", "MaxFDypi")
+            )
+            top = np.full_like(z, -20)
+            paths = np.stack(
+                (np.stack((y, x, top), axis=1), np.stack((y, x, z), axis=1)), axis=1
             )
+            names = wells["Borholunofn"].to_numpy(dtype=str)
+        wellheads = np.array([path[0] for path in paths]).reshape(-1, 3)
+        if not len(wellheads):
+            return
+
+        self.ax_3d.add_collection3d(
+            Line3DCollection(paths, colors="k", capstyle="round")
+        )
+        # add_collection3d() doesn't update the data limits, unlike plot()
+        self.ax_3d.auto_scale_xyz(*np.concatenate(paths).T, had_data=True)
+        self.ax_3d.scatter(*wellheads.T, c="k", s=3)
+        for j in _declutter(wellheads[:, 0], wellheads[:, 1], self.LABEL_SPACING):
+            y, x = wellheads[j, :2]
             self.ax_3d.text(
-                y[j], x[j], 0, name[j], c=settings["palette"]["blue"], fontsize=8
+                y, x, 0, names[j], c=settings["palette"]["blue"], fontsize=8
             )
 
-    def plot_distances(self, distances: dict, z, CASING_DEPTH_ABSOLUTE):
+    def plot_distances(self, distances, well_names, z, CASING_DEPTH_ABSOLUTE):
+        """Plots the distance to each incumbent well against depth.
+
+        Args:
+            distances (np.array): (n_wells, M) distances at the depths of
+                the proposed well, NaN where they don't overlap, see
+                Distance.distances
+            well_names (np.array): (n_wells,) names of the incumbent wells
+            z (np.array): (M,) depths of the proposed well
+            CASING_DEPTH_ABSOLUTE (float): Depth of the casing line
+        """
+
+        self.distance_lines = dict()
+        self.legend_names = None
+        self.no_wells_text = self.ax_distances.text(
+            100,
+            0.7,
+            f'No wells at distance <{settings["max_distance"]} m',
+            rotation=45,
+        )
+        self.casing_depth_line = self.ax_distances.hlines(
+            CASING_DEPTH_ABSOLUTE, 0, 1000, color="k", linestyles="dashed"
+        )
+        self.update_distances(distances, well_names, z, CASING_DEPTH_ABSOLUTE)
+        self.fig.tight_layout(rect=self.layout_rect)
+
+    def update_distances(self, distances, well_names, z, CASING_DEPTH_ABSOLUTE):
+        """Redraws the distance curves, reusing the lines of wells plotted before.
+
+        Args:
+            See plot_distances()
+
+        Returns:
+            (bool): Whether the wells in the legend changed
+        """
+
         legend = []
-        no_of_wells_plotted = 0
-        for well_name, distance_curve in distances.items():
-            if min(distance_curve) < settings["max_distance"]:
-                no_of_wells_plotted += 1
-                legend.append(well_name)
-                self.ax_distances.plot(distance_curve, z[: len(distance_curve)])
-        if not no_of_wells_plotted:
-            self.ax_distances.text(
-                100,
-                0.7,
-                f'No wells at distance <{settings["max_distance"]} m',
-                rotation=45,
+        min_distances = np.fmin.reduce(distances, axis=1, initial=np.inf)
+        for row in np.flatnonzero(min_distances < settings["max_distance"]):
+            well_name = well_names[row]
+            legend.append(well_name)
+            # NaN where the depths don't overlap breaks the line there
+            if well_name in self.distance_lines:
+                self.distance_lines[well_name].set_data(distances[row], z)
+            else:
+                (self.distance_lines[well_name],) = self.ax_distances.plot(
+                    distances[row], z
+                )
+        for well_name, line in self.distance_lines.items():
+            line.set_visible(well_name in legend)
+        self.no_wells_text.set_visible(not legend)
+        self.casing_depth_line.set_segments(
+            [[(0, CASING_DEPTH_ABSOLUTE), (1000, CASING_DEPTH_ABSOLUTE)]]
+        )
+        self.casing_depth_line.set_visible(bool(legend))
+
+        is_changed = legend != self.legend_names
+        if is_changed:
+            self.ax_distances.legend(
+                [self.distance_lines[well_name] for well_name in legend], legend
+            )
+            self.legend_names = legend
+
+        return is_changed
+
+
+class InteractiveGUI(GUI):
+    """The GUI with a slider and a text box for each trajectory parameter.
+
+    The figure, terrain and incumbent wells are drawn once. A parameter
+    change only moves the trajectory and distance artists, with the 2D
+    profile from the ProfileCache and distances from Distance.update().
+    Where the backend supports it and the axes limits don't change, the
+    moved artists are blitted onto a saved background instead of
+    redrawing the figure.
+
+    Attributes:
+        parameters (dict): The well trajectory parameters.
+            See default_values in config.json
+        incumbent_wells: Incumbent wells, see Distance
+        elevation_data (ElevationGrid): See GUI.plot_elevation_map()
+    """
+
+    INTEGER_KEYS = ("dip",)
+
+    def __init__(self, parameters: dict, incumbent_wells, elevation_data):
+        super().__init__()
+        self.layout_rect = (0, 0.22, 1, 1)
+        self.parameters = dict(parameters)
+        self._background = None
+        self._is_syncing = False
+
+        trajectory = Trajectory3d(self.parameters)
+        self.parameters["Z"] = trajectory.Z
+        x, y, r, z, casing_index = trajectory.fork_r()
+        self.plot_2d_trajectory(r, z, casing_index)
+        self.plot_3d_trajectory(x, y, z, casing_index)
+        self.plot_elevation_map(elevation_data)
+        self.plot_incumbent_wells(incumbent_wells)
+        self.distance = Distance(
+            incumbent_wells,
+            np.array((x, y, z)).T,
+            index=WellIndex(incumbent_wells),
+        )
+        self.distance.run()
+        self.plot_distances(
+            self.distance.distances,
+            self.distance.surveys().names,
+            z,
+            CASING_DEPTH_ABSOLUTE=z[casing_index] - trajectory.Z,
+        )
+        self.status_text = self.fig.text(
+            0.02, 0.21, "", color=settings["palette"]["red"]
+        )
+
+        self._add_widgets()
+        if self.fig.canvas.supports_blit:
+            for artist in self._moving_artists():
+                artist.set_animated(True)
+            self.fig.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _ranges(self):
+        area = settings["locations_bbox"][settings["geothermal_area"]]
+        ranges = dict(settings["slider_ranges"])
+        ranges["X"] = area["ulx"], area["lrx"]
+        ranges["Y"] = area["lry"], area["uly"]
+
+        return ranges
+
+    def _add_widgets(self):
+        ranges = self._ranges()
+        units = dict(zip(settings["default_values"], settings["units"]))
+        self.sliders, self.text_boxes = dict(), dict()
+        for row, (key, value) in enumerate(self.parameters.items()):
+            bottom = 0.19 - 0.02 * row
+            low, high = ranges.get(key, (value / 2, value * 2))
+            slider = Slider(
+                self.fig.add_axes([0.15, bottom, 0.6, 0.015]),
+                f"{key} [{units.get(key, '')}]",
+                min(low, value),
+                max(high, value),
+                valinit=value,
+                valstep=1 if key in self.INTEGER_KEYS else None,
+            )
+            text_box = TextBox(
+                self.fig.add_axes([0.82, bottom, 0.12, 0.015]), "", initial=f"{value:g}"
             )
+            # Redrawn by _redraw() instead
+            slider.drawon = False
+            text_box.drawon = False
+            slider.on_changed(lambda value, key=key: self._on_slider(key, value))
+            text_box.on_submit(lambda text, key=key: self._on_submit(key, text))
+            self.sliders[key] = slider
+            self.text_boxes[key] = text_box
+
+    def _widget_axes(self):
+        widgets = (*self.sliders.values(), *self.text_boxes.values())
+
+        return [widget.ax for widget in widgets]
+
+    def _moving_artists(self):
+        return [
+            *self.trajectory_2d,
+            *self.trajectory_3d,
+            self.well_label,
+            self.casing_depth_line,
+            self.no_wells_text,
+            self.status_text,
+            *self.distance_lines.values(),
+        ]
+
+    def _on_draw(self, event):
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_moving_artists()
+
+    def _draw_moving_artists(self):
+        for artist in self._moving_artists():
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
+
+    def _redraw(self, is_full: bool):
+        canvas = self.fig.canvas
+        if is_full or self._background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self._background)
+        self._draw_moving_artists()
+        for ax in self._widget_axes():
+            self.fig.draw_artist(ax)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def _show_value(self, key: str, value):
+        """Sets the widgets of a parameter without updating the plots."""
+
+        self._is_syncing = True
+        slider = self.sliders[key]
+        if slider.valmin <= value <= slider.valmax:
+            slider.set_val(value)
+        self.text_boxes[key].set_val(f"{value:g}")
+        self._is_syncing = False
+
+    def _on_slider(self, key: str, value):
+        if self._is_syncing:
+            return
+        if key in self.INTEGER_KEYS:
+            value = int(round(value))
+        self._is_syncing = True
+        self.text_boxes[key].set_val(f"{value:g}")
+        self._is_syncing = False
+        self.update(key, value)
+
+    def _on_submit(self, key: str, text: str):
+        if self._is_syncing:
+            return
+        try:
+            value = float(text)
+        except ValueError:
+            self.status_text.set_text(f"{key}: '{text}' is not a number")
+            self._redraw(is_full=False)
+            return
+        slider = self.sliders[key]
+        if slider.valmin <= value <= slider.valmax:
+            # Updates through _on_slider()
+            slider.set_val(value)
         else:
-            self.ax_distances.hlines(
-                CASING_DEPTH_ABSOLUTE, 0, 1000, color="k", linestyles="dashed"
+            self.update(key, int(round(value)) if key in self.INTEGER_KEYS else value)
+
+    def update(self, key: str, value):
+        """Sets one parameter and moves the trajectory and distance artists.
+
+        Args:
+            key (str): Any of the default_values in config.json
+            value (float): The new value
+        """
+
+        if not is_feasible(dict(self.parameters, **{key: value})):
+            # Keep, and show, the last feasible value
+            self._show_value(key, self.parameters[key])
+            self.status_text.set_text(
+                f"{key} = {value:g} leaves no room for the slanted leg, "
+                "check mmd, kop, dip and bu"
             )
-        self.ax_distances.legend(legend)
-        self.fig.tight_layout()
+            self._redraw(is_full=False)
+            return
+        self.parameters[key] = value
+        self.status_text.set_text("")
+
+        trajectory = Trajectory3d(self.parameters)
+        x, y, r, z, casing_index = trajectory.fork_r()
+        is_full = not self.update_trajectory(x, y, r, z, casing_index)
+        self.distance.update(np.array((x, y, z)).T)
+        is_full |= self.update_distances(
+            self.distance.distances,
+            self.distance.surveys().names,
+            z,
+            CASING_DEPTH_ABSOLUTE=z[casing_index] - trajectory.Z,
+        )
+        # The distance curves span the depths of the trajectory
+        is_full |= not _fits(self.ax_distances, self.ax_distances.get_xlim(), z)
+        for artist in self.distance_lines.values():
+            artist.set_animated(self.fig.canvas.supports_blit)
 
+        if is_full:
+            self.ax_2d.relim(visible_only=True)
+            self.ax_2d.autoscale_view()
+            # Distances keep their fixed x limits
+            self.ax_distances.relim(visible_only=True)
+            self.ax_distances.autoscale_view(scalex=False)
+        self._redraw(is_full)
@@ -2,11 +2,8 @@ from geofeatures import elevation
 from geofeatures import wells
 
 elevation.Download()
-p = elevation.Process()
-p.run()
+elevation.process_all_locations()
 
-wells_instance = wells.OpenSourceWells()
-all_wells_in_iceland = wells_instance.download()
-wells_raw = wells_instance.filter_area(all_wells_in_iceland)
-wells_df = wells_instance.process(wells_raw)
-wells_instance.save(wells_df)
\ No newline at end of file
+wells_instance = wells.OpenSourceWells(source=wells.settings["borholuskra"])
+wells_df = wells_instance.stream()
+wells_instance.save(wells_df)
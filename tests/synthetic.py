@@ -0,0 +1,74 @@
+"""Synthetic wells shared by the tests."""
+
+import os
+import sys
+
+import json
+import numpy as np
+import pandas as pd
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.trajectory import Trajectory3d
+
+with open("config.json") as f:
+    settings = json.load(f)
+parameters = settings["default_values"]
+
+
+def synthetic_wells(n_wells, seed=0):
+    """Vertical wells scattered around Reykjanes, in wells.csv format."""
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        dict(
+            Borholunofn=[f"RN-{j}" for j in range(n_wells)],
+            x=rng.uniform(317_000, 320_000, n_wells),
+            y=rng.uniform(373_000, 376_000, n_wells),
+            MaxFDypi=rng.uniform(100, 3000, n_wells),
+        )
+    )
+
+
+def deviated_wells(n_wells, seed=0):
+    """Random-walk polylines of deviated wells around Reykjanes."""
+
+    rng = np.random.default_rng(seed)
+    polylines = dict()
+    for j in range(n_wells):
+        no_of_stations = rng.integers(2, 60)
+        wellhead = [rng.uniform(317_000, 320_000), rng.uniform(373_000, 376_000), 0]
+        steps = np.column_stack(
+            (
+                rng.normal(0, 15, (no_of_stations - 1, 2)),
+                rng.uniform(10, 60, no_of_stations - 1),
+            )
+        )
+        polylines[f"RN-{j}"] = np.vstack(
+            (wellhead, wellhead + np.cumsum(steps, axis=0))
+        )
+    return polylines
+
+
+def proposed_well(**custom_params):
+    """(M, 3) coordinates of the default trajectory, or of custom_params."""
+
+    x, y, _, z, _ = Trajectory3d(dict(parameters, **custom_params)).fork_r()
+    return np.array((x, y, z)).T
+
+
+def deviated_surveys(n_wells=50, seed=0):
+    """Wells drifting in random directions, with 2 to 200 stations each."""
+
+    rng = np.random.default_rng(seed)
+    surveys = dict()
+    for j in range(n_wells):
+        no_of_stations = rng.integers(2, 200)
+        z = np.linspace(30, rng.uniform(500, 3000), no_of_stations)
+        drift = rng.uniform(-0.3, 0.3, 2) * (z - 30)[:, None]
+        xy = rng.uniform([316_000, 372_000], [320_000, 376_000]) + drift
+        surveys[f"RN-{j}"] = np.column_stack((xy, z))
+
+    return surveys
@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+import json
+import numpy as np
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.anticollision import ClosestApproach, closest_points_on_segments
+from synthetic import deviated_wells, proposed_well, synthetic_wells
+
+with open("config.json") as f:
+    settings = json.load(f)
+
+
+class TestClosestPoints(unittest.TestCase):
+    def test_against_sampling(self):
+        rng = np.random.default_rng(0)
+        p0, p1, q0, q1 = (rng.normal(size=(100, 3)) for _ in range(4))
+        q1[:20] = q0[:20]  # Degenerate
+        q1[20:40] = q0[20:40] + (p1 - p0)[20:40]  # Parallel
+        distance, closest_p, closest_q = closest_points_on_segments(p0, p1, q0, q1)
+
+        s = np.linspace(0, 1, 201)
+        p = p0[:, None, None] + s[None, :, None, None] * (p1 - p0)[:, None, None]
+        q = q0[:, None, None] + s[None, None, :, None] * (q1 - q0)[:, None, None]
+        sampled = np.linalg.norm(p - q, axis=-1).min(axis=(1, 2))
+
+        self.assertTrue((distance <= sampled + 1e-9).all())
+        np.testing.assert_allclose(distance, sampled, atol=1e-3)
+        np.testing.assert_allclose(
+            np.linalg.norm(closest_p - closest_q, axis=-1), distance
+        )
+
+
+class TestClosestApproach(unittest.TestCase):
+    def test_against_brute_force(self):
+        polylines = deviated_wells(200)
+        proposed = proposed_well()
+        max_distance = settings["max_distance"]
+        approaches = ClosestApproach(polylines).run(proposed, max_distance)
+
+        expected = dict()
+        p0, p1 = proposed[:-1], proposed[1:]
+        for well_name, stations in polylines.items():
+            q0, q1 = stations[:-1], stations[1:]
+            i = np.repeat(np.arange(len(p0)), len(q0))
+            k = np.tile(np.arange(len(q0)), len(p0))
+            distance, _, _ = closest_points_on_segments(p0[i], p1[i], q0[k], q1[k])
+            if distance.min() <= max_distance:
+                expected[well_name] = distance.min()
+
+        self.assertTrue(expected)
+        self.assertEqual(set(approaches.index), set(expected))
+        for well_name, distance in expected.items():
+            self.assertAlmostEqual(approaches.loc[well_name, "distance"], distance)
+
+    def test_no_wells(self):
+        approaches = ClosestApproach(dict()).run(proposed_well())
+        self.assertTrue(approaches.empty)
+        self.assertIn("distance", approaches.columns)
+
+    def test_duplicate_names(self):
+        wells = synthetic_wells(3)
+        wells.loc[2, "Borholunofn"] = wells.loc[0, "Borholunofn"]
+        with self.assertRaises(ValueError):
+            ClosestApproach.from_wells(wells)
+
+
+if __name__ == "__main__":
+    unittest.main()
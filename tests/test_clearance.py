@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import scipy.sparse
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.anticollision import ClosestApproach
+from geofeatures.clearance import FieldClearance, _init_worker, clearance_of
+from geofeatures.surveys import WellSurveyStore
+from synthetic import deviated_surveys
+
+
+class TestFieldClearance(unittest.TestCase):
+    def setUp(self):
+        self.surveys = deviated_surveys(30)
+        self.store = WellSurveyStore.from_surveys(self.surveys)
+
+    def test_against_all_pairs(self):
+        clearance = FieldClearance(self.store, max_distance=400, max_workers=1)
+        distance, depth = clearance.run(chunk_size=7)
+        coo = distance.tocoo()
+        measured = set(zip(coo.row.tolist(), coo.col.tolist()))
+        names = list(self.surveys)
+        for j, name in enumerate(names):
+            for k, other in enumerate(names):
+                if j == k:
+                    continue
+                approach = ClosestApproach({other: self.surveys[other]}).run(
+                    self.surveys[name], max_distance=400
+                )
+                if approach.empty:
+                    self.assertNotIn((j, k), measured)
+                    continue
+                self.assertIn((j, k), measured)
+                self.assertAlmostEqual(distance[j, k], approach["distance"].iloc[0])
+                self.assertAlmostEqual(depth[j, k], approach["z"].iloc[0])
+        self.assertEqual((distance != distance.T).nnz, 0)
+
+    def test_pairs_measured_once(self):
+        clearance = FieldClearance(self.store, max_distance=400, max_workers=1)
+        _init_worker(clearance.surveys, clearance.max_distance)
+        rows, columns, *_ = clearance_of(clearance.candidate_pairs())
+        self.assertTrue((rows < columns).all())
+        self.assertEqual(len(set(zip(rows, columns))), len(rows))
+
+        clearance.run()
+        pairs = clearance.pairs()
+        self.assertEqual(len(pairs), clearance.distance.nnz // 2)
+        self.assertEqual(len(pairs), len(rows))
+        for pair in pairs.itertuples():
+            j, k = (self.store.index_of(name) for name in (pair.well, pair.other))
+            self.assertEqual(pair.depth, clearance.depth[j, k])
+            self.assertEqual(pair.other_depth, clearance.depth[k, j])
+
+    def test_no_pairs(self):
+        clearance = FieldClearance(self.store, max_distance=1, max_workers=1)
+        distance, depth = clearance.run()
+        self.assertEqual(distance.nnz, 0)
+        self.assertEqual(depth.shape, (30, 30))
+        pairs = clearance.pairs()
+        self.assertTrue(pairs.empty)
+        self.assertEqual(
+            list(pairs.columns), ["well", "other", "distance", "depth", "other_depth"]
+        )
+
+    def test_touching_wells(self):
+        surveys = dict(self.surveys)
+        # A sidetrack from the wellhead of RN-0
+        surveys["RN-0 B"] = surveys["RN-0"][0] + np.array(
+            [[0, 0, 0], [200, 0, 1000], [400, 0, 2000]]
+        )
+        clearance = FieldClearance(
+            WellSurveyStore.from_surveys(surveys), max_distance=400, max_workers=1
+        )
+        distance, _ = clearance.run()
+        pairs = clearance.pairs().set_index(["well", "other"])
+        self.assertEqual(pairs.loc[("RN-0", "RN-0 B"), "distance"], 0)
+        # The 0 is stored, unlike pairs out of range
+        self.assertEqual(distance.nnz, 2 * len(pairs))
+
+    def test_pool_and_save(self):
+        clearance = FieldClearance(self.store, max_distance=400, max_workers=2)
+        distance, depth = clearance.run(chunk_size=5)
+        expected, _ = FieldClearance(self.store, max_distance=400, max_workers=1).run()
+        np.testing.assert_allclose(distance.toarray(), expected.toarray())
+        with tempfile.TemporaryDirectory() as folder:
+            clearance.save(folder)
+            loaded = scipy.sparse.load_npz(os.path.join(folder, "depth.npz"))
+            np.testing.assert_allclose(loaded.toarray(), depth.toarray())
+            self.assertEqual(loaded.nnz, depth.nnz)
+            names = np.load(os.path.join(folder, "names.npy"))
+            self.assertEqual(list(names), list(self.surveys))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,16 @@
 import os
 import sys
+import tempfile
 import unittest
 
+import numpy as np
+import pandas as pd
+
 # To import from other parent directory in repo
 pwd = os.getcwd()
 sys.path.insert(0, pwd)
 
-from coordinate_conversion import Conversion
+from coordinate_conversion import Conversion, convert_csv
 
 # Hnit til prófunar í báðum hnitakerfum úr borholugrunni OS
 # Þessi tilteknu eru holutoppshnit RN-27:
@@ -30,6 +34,54 @@ class TestCoordinateConversion(unittest.TestCase):
         self.assertAlmostEqual(lon_test, lon_verification)
         self.assertAlmostEqual(lat_test, lat_verification)
 
+    def test_arrays(self):
+        conversion_ = Conversion()
+        rng = np.random.default_rng(0)
+        lon = rng.uniform(-24.5, -13.5, (100, 10))
+        lat = rng.uniform(63.3, 66.6, (100, 10))
+        x, y = conversion_.wgs_to_isn(lon, lat)
+        self.assertEqual(x.shape, (100, 10))
+        self.assertAlmostEqual(x[0, 0], conversion_.wgs_to_isn(lon[0, 0], lat[0, 0])[0])
+        lon_test, lat_test = conversion_.isn_to_wgs(x, y)
+        np.testing.assert_allclose(lon_test, lon, atol=1e-4)
+        np.testing.assert_allclose(lat_test, lat, atol=1e-4)
+
+    def test_convert_csv(self):
+        rng = np.random.default_rng(0)
+        wells = pd.DataFrame(
+            {
+                "Borholunofn": [f"RN-{n}" for n in range(1001)],
+                "lon": rng.uniform(-24.5, -13.5, 1001),
+                "lat": rng.uniform(63.3, 66.6, 1001),
+            }
+        )
+        with tempfile.TemporaryDirectory() as folder:
+            wgs_filename = os.path.join(folder, "wgs.csv")
+            isn_filename = os.path.join(folder, "isn.csv")
+            back_filename = os.path.join(folder, "back.csv")
+            wells.to_csv(wgs_filename, index=False)
+
+            self.assertEqual(
+                convert_csv(wgs_filename, isn_filename, chunksize=100), 1001
+            )
+            isn = pd.read_csv(isn_filename)
+            self.assertEqual(list(isn.columns), ["Borholunofn", "lon", "lat", "x", "y"])
+            x, y = Conversion().wgs_to_isn(wells["lon"].values, wells["lat"].values)
+            np.testing.assert_allclose(isn["x"], x)
+            np.testing.assert_allclose(isn["y"], y)
+
+            convert_csv(
+                isn_filename,
+                back_filename,
+                direction="isn_to_wgs",
+                output_columns=("lon_back", "lat_back"),
+                chunksize=300,
+            )
+            back = pd.read_csv(back_filename)
+            np.testing.assert_allclose(back["lon_back"], wells["lon"], atol=1e-4)
+            np.testing.assert_allclose(back["lat_back"], wells["lat"], atol=1e-4)
+            self.assertFalse(os.path.exists(f"{back_filename}.tmp"))
+
 
 if __name__ == "__main__":
     unittest.main()
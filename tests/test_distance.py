@@ -0,0 +1,99 @@
+import os
+import sys
+import unittest
+
+import json
+import numpy as np
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.distance import Distance, interpolate_rows
+from geofeatures.spatial import WellIndex
+from synthetic import proposed_well, synthetic_wells
+
+with open("config.json") as f:
+    settings = json.load(f)
+parameters = settings["default_values"]
+
+
+class TestInterpolateRows(unittest.TestCase):
+    def test_matches_np_interp(self):
+        rng = np.random.default_rng(1)
+        z_stations = np.sort(rng.uniform(0, 2000, (20, 30)), axis=1)
+        values = rng.normal(size=(20, 30))
+        z_query = np.linspace(-50, 2100, 140)
+        interpolated = interpolate_rows(z_query, z_stations, values)
+        for row in range(len(z_stations)):
+            is_overlapping = (z_query >= z_stations[row, 0]) & (
+                z_query <= z_stations[row, -1]
+            )
+            expected = np.interp(z_query, z_stations[row], values[row])
+            np.testing.assert_allclose(
+                interpolated[row, is_overlapping], expected[is_overlapping]
+            )
+            self.assertTrue(np.isnan(interpolated[row, ~is_overlapping]).all())
+
+    def test_no_rows(self):
+        z_query = np.linspace(0, 100, 5)
+        interpolated = interpolate_rows(z_query, np.empty((0, 4)), np.empty((0, 4, 3)))
+        self.assertEqual(interpolated.shape, (0, 5, 3))
+
+
+class TestDistance(unittest.TestCase):
+    def test_vertical_incumbents(self):
+        wells = synthetic_wells(30)
+        proposed = proposed_well()
+        distance_ = Distance(wells, proposed)
+        distances = distance_.run()
+        self.assertEqual(distance_.distances.shape, (len(wells), len(proposed)))
+
+        z_top = parameters["Z"]
+        for j, well in wells.iterrows():
+            is_overlapping = (proposed[:, 2] >= z_top) & (
+                proposed[:, 2] <= well["MaxFDypi"]
+            )
+            expected = np.hypot(
+                proposed[is_overlapping, 0] - well["x"],
+                proposed[is_overlapping, 1] - well["y"],
+            )
+            np.testing.assert_allclose(distance_.distances[j, is_overlapping], expected)
+            np.testing.assert_allclose(distances[well["Borholunofn"]], expected)
+
+    def test_index_pruning(self):
+        wells = synthetic_wells(500)
+        proposed = proposed_well()
+        max_distance = settings["max_distance"]
+        unpruned = Distance(wells, proposed).distance_matrix()
+        pruned = Distance(
+            wells, proposed, index=WellIndex(wells), max_distance=max_distance
+        ).distance_matrix()
+
+        is_near = np.nanmin(np.where(np.isnan(unpruned), np.inf, unpruned), axis=1)
+        is_near = is_near < max_distance
+        self.assertTrue(is_near.any())
+        np.testing.assert_allclose(pruned[is_near], unpruned[is_near])
+        # Pruned wells can only be left out if they are far away
+        is_pruned = np.isnan(pruned).all(axis=1) & ~np.isnan(unpruned).all(axis=1)
+        self.assertTrue(is_pruned.any())
+        self.assertTrue((np.nanmin(unpruned[is_pruned], axis=1) >= max_distance).all())
+
+    def test_update(self):
+        wells = synthetic_wells(500)
+        for index in (None, WellIndex(wells)):
+            distance_ = Distance(wells, proposed_well(), index=index)
+            distance_.run()
+            for custom_params in (
+                dict(mmd=2600),
+                dict(cd=1200, mmd=3000),
+                dict(az=200),
+            ):
+                distances = distance_.update(proposed_well(**custom_params))
+                reference = Distance(wells, proposed_well(**custom_params), index=index)
+                self.assertEqual(distances, reference.run())
+                np.testing.assert_array_equal(distance_.distances, reference.distances)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.download import RangeDownload
+
+CONTENT = os.urandom(1_000_003)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves CONTENT at /dem.tif, with byte ranges unless accept_ranges is off."""
+
+    accept_ranges = True
+    failing_start = None
+    ranges = []
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self, status, length, content_range=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        if self.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def do_HEAD(self):
+        if self.path != "/dem.tif":
+            return self._headers(404, 0)
+        self._headers(200, len(CONTENT))
+
+    def do_GET(self):
+        if self.path != "/dem.tif":
+            return self._headers(404, 0)
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if match and self.accept_ranges:
+            start, end = map(int, match.groups())
+            if start == self.failing_start:
+                return self._headers(500, 0)
+            type(self).ranges.append(start)
+            self._headers(206, end - start + 1, f"bytes {start}-{end}/{len(CONTENT)}")
+            self.wfile.write(CONTENT[start : end + 1])
+        else:
+            self._headers(200, len(CONTENT))
+            self.wfile.write(CONTENT)
+
+
+class TestRangeDownload(unittest.TestCase):
+    def setUp(self):
+        RangeHandler.accept_ranges = True
+        RangeHandler.failing_start = None
+        RangeHandler.ranges = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/dem.tif"
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, "iceland.tif")
+        self.checksum = hashlib.sha256(CONTENT).hexdigest()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.folder.cleanup()
+
+    def _download(self, **kwargs):
+        return RangeDownload(
+            self.url, self.filename, chunk_size=100_000, max_workers=4, **kwargs
+        )
+
+    def _read(self):
+        with open(self.filename, "rb") as f:
+            return f.read()
+
+    def test_parallel_ranges(self):
+        self._download(checksum=self.checksum).run()
+        self.assertEqual(self._read(), CONTENT)
+        self.assertEqual(len(RangeHandler.ranges), 11)
+        self.assertFalse(os.path.exists(f"{self.filename}.part"))
+        self.assertFalse(os.path.exists(f"{self.filename}.part.json"))
+
+    def test_resume(self):
+        download = self._download()
+        # An earlier run that got chunks 0 to 4 before dropping
+        with open(download.part_filename, "wb") as f:
+            f.write(CONTENT[:500_000])
+            f.truncate(len(CONTENT))
+        with open(download.state_filename, "w") as f:
+            json.dump(
+                dict(
+                    url=self.url,
+                    size=len(CONTENT),
+                    chunk_size=100_000,
+                    done=[0, 1, 2, 3, 4],
+                ),
+                f,
+            )
+        download.run()
+        self.assertEqual(self._read(), CONTENT)
+        self.assertEqual(
+            sorted(RangeHandler.ranges), list(range(500_000, 1_000_003, 100_000))
+        )
+
+    def test_failed_chunk_keeps_the_others(self):
+        RangeHandler.failing_start = 300_000
+        download = self._download()
+        with self.assertRaises(requests.HTTPError):
+            download.run()
+        with open(download.state_filename) as f:
+            self.assertEqual(
+                sorted(json.load(f)["done"]), [0, 1, 2, 4, 5, 6, 7, 8, 9, 10]
+            )
+
+        RangeHandler.failing_start = None
+        RangeHandler.ranges = []
+        download.run()
+        self.assertEqual(self._read(), CONTENT)
+        self.assertEqual(RangeHandler.ranges, [300_000])
+
+    def test_without_ranges(self):
+        RangeHandler.accept_ranges = False
+        self._download(checksum=self.checksum).run()
+        self.assertEqual(self._read(), CONTENT)
+
+    def test_checksum_mismatch(self):
+        with self.assertRaises(ValueError):
+            self._download(checksum="0" * 64).run()
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertFalse(os.path.exists(f"{self.filename}.part"))
+
+    def test_not_found(self):
+        self.url = self.url.replace("dem.tif", "missing.tif")
+        with self.assertRaises(requests.HTTPError):
+            self._download().run()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,6 +14,7 @@ pwd = os.getcwd()
 sys.path.insert(0, pwd)
 
 from geofeatures.elevation import Process
+from geofeatures.grid import ElevationGrid
 from geofeatures.wells import OpenSourceWells
 from geofeatures.trajectory import Trajectory3d
 from geofeatures.distance import Distance
@@ -44,8 +45,7 @@ class FigureTests:
             process = Process(location, coordinates)
             process.run()
             break  # Only want Reykjanes
-        with open(f"data/Reykjanes.json") as f:
-            elevation_data = json.load(f)
+        elevation_data = ElevationGrid.load("data/Reykjanes.grid")
         UnitPlots.plot_elevation_map(elevation_data)
         write_test_results("elevation")
 
@@ -119,9 +119,7 @@ class UnitPlots:
         """
         fig = plt.figure(figsize=(8, 8))
         ax = fig.add_subplot(111, projection="3d")
-        x = np.array(elevation_data["x"])
-        y = np.array(elevation_data["y"])
-        z = np.array(elevation_data["z"])
+        x, y, z = elevation_data.mesh()
         ax.plot_surface(
             x,
             y,
@@ -0,0 +1,284 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.grid import (
+    ElevationGrid,
+    ElevationPyramid,
+    bbox_window,
+    copy_raster,
+    read_raster,
+)
+
+class StandInRaster:
+    """Just enough of a north-up gdal.Dataset (and its band) to read from.
+
+    Attributes:
+        z (np.array): (rows, cols) pixel values, north at the top
+        ulx, uly (float): Upper left corner of the raster
+        resolution (float): Pixel size
+        nodata (float, optional): The nodata value of the band
+    """
+
+    def __init__(self, z, ulx, uly, resolution, nodata=None):
+        self.z = z
+        self.geotransform = (ulx, resolution, 0, uly, 0, -resolution)
+        self.nodata = nodata
+        self.RasterYSize, self.RasterXSize = z.shape
+        self.reads = []
+
+    def GetGeoTransform(self):
+        return self.geotransform
+
+    def GetRasterBand(self, band):
+        return self
+
+    def GetNoDataValue(self):
+        return self.nodata
+
+    def ReadAsArray(self, xoff, yoff, xsize, ysize):
+        self.reads.append((xoff, yoff, xsize, ysize))
+        return self.z[yoff : yoff + ysize, xoff : xoff + xsize].copy()
+
+
+class TestElevationGrid(unittest.TestCase):
+    def test_save_load(self):
+        z = np.random.default_rng(0).uniform(0, 100, (30, 40))
+        grid = ElevationGrid(z, 317_000, 20, 373_000, 25)
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "Reykjanes.grid")
+            grid.save(filename)
+            for mmap in (True, False):
+                loaded = ElevationGrid.load(filename, mmap=mmap)
+                np.testing.assert_allclose(loaded.z, z, rtol=1e-6)
+                x, y, _ = loaded.mesh()
+                x_expected, y_expected = np.meshgrid(
+                    317_000 + 20 * np.arange(40), 373_000 + 25 * np.arange(30)
+                )
+                np.testing.assert_array_equal(x, x_expected)
+                np.testing.assert_array_equal(y, y_expected)
+                del loaded, x, y
+
+    def test_not_a_grid(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "Reykjanes.json")
+            with open(filename, "wb") as f:
+                f.write(b"{}" * 64)
+            with self.assertRaises(ValueError):
+                ElevationGrid.load(filename)
+
+    def test_sample_is_exact_for_planes(self):
+        x, y = 317_010 + 20 * np.arange(60), 373_010 + 20 * np.arange(40)
+        x_mesh, y_mesh = np.meshgrid(x, y)
+        grid = ElevationGrid(3 * x_mesh - 2 * y_mesh, x[0], 20, y[0], 20)
+        rng = np.random.default_rng(0)
+        x_points = rng.uniform(x[0], x[-1], 1000)
+        y_points = rng.uniform(y[0], y[-1], 1000)
+        np.testing.assert_allclose(
+            grid.sample(x_points, y_points), 3 * x_points - 2 * y_points
+        )
+        # Clamped to the edge outside the grid
+        self.assertAlmostEqual(grid.sample(x[0] - 100, y[0]), 3 * x[0] - 2 * y[0])
+
+    def test_resample_layout(self):
+        x, y = 317_010 + 20 * np.arange(150), 373_010 + 20 * np.arange(120)
+        x_mesh, y_mesh = np.meshgrid(x, y)
+        grid = ElevationGrid(
+            np.sin(x_mesh / 300) + np.cos(y_mesh / 200), x[0], 20, y[0], 20
+        )
+        resampled = grid.resample(50, 50)
+
+        x_expected, y_expected = np.meshgrid(
+            np.linspace(x[0], x[-1], 50), np.linspace(y[0], y[-1], 50)
+        )
+        x_resampled, y_resampled, z_resampled = resampled.mesh()
+        np.testing.assert_allclose(x_resampled, x_expected)
+        np.testing.assert_allclose(y_resampled, y_expected)
+        np.testing.assert_allclose(
+            z_resampled, np.sin(x_expected / 300) + np.cos(y_expected / 200), atol=5e-3
+        )
+
+
+class TestElevationPyramid(unittest.TestCase):
+    def setUp(self):
+        z = np.random.default_rng(0).uniform(0, 100, (150, 135))
+        self.grid = ElevationGrid(z, 317_010, 20, 373_010, 20)
+        self.pyramid = ElevationPyramid.build(self.grid)
+
+    def test_levels(self):
+        shapes = [level.shape for level in self.pyramid.levels]
+        self.assertEqual(shapes, [(150, 135), (75, 68), (38, 34), (19, 17)])
+        level_1 = self.pyramid.levels[1]
+        self.assertAlmostEqual(level_1.z[0, 0], self.grid.z[:2, :2].mean(), places=4)
+        # Odd edge averages the repeated last column
+        self.assertAlmostEqual(level_1.z[0, -1], self.grid.z[:2, -1].mean(), places=4)
+        self.assertEqual((level_1.x0, level_1.dx), (317_020, 40))
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            directory = os.path.join(folder, "Reykjanes.pyramid")
+            self.pyramid.save(directory)
+            loaded = ElevationPyramid.load(directory)
+            self.assertEqual(len(loaded.levels), len(self.pyramid.levels))
+            for level, expected in zip(loaded.levels, self.pyramid.levels):
+                np.testing.assert_allclose(level.z, expected.z, rtol=1e-6)
+            del loaded, level
+
+    def test_save_removes_stale_levels(self):
+        with tempfile.TemporaryDirectory() as folder:
+            directory = os.path.join(folder, "Reykjanes.pyramid")
+            self.pyramid.save(directory)
+            smaller = ElevationPyramid.build(self.grid.downsample())
+            smaller.save(directory)
+            loaded = ElevationPyramid.load(directory)
+            self.assertEqual(len(loaded.levels), len(smaller.levels))
+            self.assertEqual(loaded.levels[0].shape, smaller.levels[0].shape)
+            del loaded
+
+    def test_build_on_disk(self):
+        with tempfile.TemporaryDirectory() as folder:
+            level_0 = ElevationGrid.create(
+                os.path.join(folder, "level-0.grid"), 150, 135, 317_010, 20, 373_010, 20
+            )
+            # Filled window by window, like a raster too large for memory
+            for i in range(0, 150, 40):
+                level_0.z[i : i + 40] = self.grid.z[i : i + 40]
+            level_0.z.flush()
+            pyramid = ElevationPyramid.build_on_disk(folder, tile_size=32)
+            self.assertEqual(len(pyramid.levels), len(self.pyramid.levels))
+            for level, expected in zip(pyramid.levels, self.pyramid.levels):
+                self.assertEqual((level.x0, level.dx), (expected.x0, expected.dx))
+                np.testing.assert_allclose(level.z, expected.z, rtol=1e-6)
+            del pyramid, level, level_0
+
+    def test_build_on_disk_removes_stale_levels(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.pyramid.save(folder)
+            os.remove(os.path.join(folder, "level-0.grid"))
+            self.grid.downsample().save(os.path.join(folder, "level-0.grid"))
+            pyramid = ElevationPyramid.build_on_disk(folder, tile_size=32)
+            loaded = ElevationPyramid.load(folder)
+            self.assertEqual(len(loaded.levels), len(pyramid.levels))
+            self.assertEqual(len(pyramid.levels), len(self.pyramid.levels) - 1)
+            del pyramid, loaded
+
+    def test_query(self):
+        area = (317_000, 320_000, 373_000, 376_000)
+        self.assertEqual(self.pyramid.select_level(area, 50**2), 2)
+        self.assertEqual(self.pyramid.select_level(area, 10), 3)
+
+        # Full resolution near the wellpad
+        wellpad = (318_000, 318_400, 374_000, 374_400)
+        window = self.pyramid.query(wellpad, 50**2)
+        self.assertEqual(window.dx, 20)
+        self.assertLessEqual(window.x[0], wellpad[0])
+        self.assertGreaterEqual(window.x[-1], wellpad[1])
+        self.assertLessEqual(window.y[0], wellpad[2])
+        self.assertGreaterEqual(window.y[-1], wellpad[3])
+        np.testing.assert_array_equal(
+            window.sample(318_210, 374_130), self.grid.sample(318_210, 374_130)
+        )
+
+
+class TestReadRaster(unittest.TestCase):
+    def setUp(self):
+        z = np.arange(12 * 15, dtype=np.float64).reshape(12, 15)
+        z[0, 0] = -9999.0
+        z[5, 7] = -32768.0
+        self.ds = StandInRaster(z, 317_000, 374_000, 20, nodata=-32768.0)
+
+    def test_whole_raster(self):
+        grid, is_nodata = read_raster(self.ds)
+        self.assertEqual(grid.z.dtype, np.float32)
+        # Rows are flipped so that y increases, pixel centres
+        np.testing.assert_array_equal(grid.z, self.ds.z[::-1])
+        self.assertEqual((grid.x0, grid.dx), (317_010, 20))
+        self.assertEqual((grid.y0, grid.dy), (374_000 - 11.5 * 20, 20))
+        self.assertEqual(grid.y[-1], 373_990)
+        np.testing.assert_array_equal(np.argwhere(is_nodata), [[6, 7], [11, 0]])
+
+    def test_window(self):
+        grid, is_nodata = read_raster(self.ds, 4, 3, 6, 5)
+        np.testing.assert_array_equal(grid.z, self.ds.z[3:8, 4:10][::-1])
+        self.assertEqual(grid.x[0], 317_000 + 4.5 * 20)
+        self.assertEqual(grid.y[-1], 374_000 - 3.5 * 20)
+        self.assertEqual(grid.y[0], 374_000 - 7.5 * 20)
+        np.testing.assert_array_equal(np.argwhere(is_nodata), [[2, 3]])
+
+        # Up to the far edges by default
+        grid, _ = read_raster(self.ds, 10, 9)
+        self.assertEqual(grid.shape, (3, 5))
+        self.assertEqual(self.ds.reads[-1], (10, 9, 5, 3))
+
+    def test_without_band_nodata(self):
+        self.ds.nodata = None
+        _, is_nodata = read_raster(self.ds)
+        np.testing.assert_array_equal(np.argwhere(is_nodata), [[11, 0]])
+
+
+class TestBboxWindow(unittest.TestCase):
+    def setUp(self):
+        # 15 x 12 pixels of 20 m from (317 000, 374 000) down to (317 300, 373 760)
+        self.ds = StandInRaster(np.zeros((12, 15)), 317_000, 374_000, 20)
+
+    def bbox(self, ulx, lrx, lry, uly):
+        return dict(ulx=ulx, lrx=lrx, lry=lry, uly=uly)
+
+    def test_inside(self):
+        window = bbox_window(self.ds, self.bbox(317_040, 317_200, 373_800, 373_940))
+        self.assertEqual(window, (2, 3, 8, 7))
+        grid, _ = read_raster(self.ds, *window)
+        self.assertEqual(grid.x[0], 317_050)
+        self.assertEqual(grid.y[-1], 373_930)
+
+    def test_clipped_at_edges(self):
+        window = bbox_window(self.ds, self.bbox(316_900, 317_200, 373_500, 374_100))
+        self.assertEqual(window, (0, 0, 10, 12))
+        window = bbox_window(self.ds, self.bbox(317_200, 318_000, 373_800, 373_940))
+        self.assertEqual(window, (10, 3, 5, 7))
+
+    def test_outside(self):
+        for bbox in (
+            self.bbox(318_000, 319_000, 373_800, 373_940),
+            self.bbox(315_000, 316_000, 373_800, 373_940),
+            self.bbox(317_040, 317_200, 374_100, 374_500),
+        ):
+            _, _, xsize, ysize = bbox_window(self.ds, bbox)
+            self.assertEqual(xsize * ysize, 0)
+            self.assertGreaterEqual(min(xsize, ysize), 0)
+
+
+class TestCopyRaster(unittest.TestCase):
+    def test_reassembles_edge_tiles(self):
+        z = np.random.default_rng(0).uniform(0, 100, (37, 53)).astype(np.float32)
+        z[[0, 20, 36], [0, 40, 52]] = -9999.0
+        ds = StandInRaster(z, 317_000, 374_000, 20)
+        expected, is_nodata = read_raster(ds)
+        expected.z[is_nodata] = 0
+        ds.reads.clear()
+
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "level-0.grid")
+            copy_raster(ds, filename, tile_size=16)
+            # 3 x 4 tiles, the last row and column of them partial
+            self.assertEqual(len(ds.reads), 12)
+            self.assertEqual(ds.reads[-1], (48, 32, 5, 5))
+
+            grid = ElevationGrid.load(filename)
+            np.testing.assert_array_equal(grid.z, expected.z)
+            self.assertEqual(
+                (grid.x0, grid.dx, grid.y0, grid.dy),
+                (expected.x0, expected.dx, expected.y0, expected.dy),
+            )
+            del grid
+
+
+if __name__ == "__main__":
+    unittest.main()
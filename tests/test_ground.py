@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+
+import json
+import numpy as np
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.grid import ElevationGrid
+from geofeatures.ground import GroundElevation
+from geofeatures.trajectory import ProfileCache, Trajectory3d, TrajectoryBatch
+
+with open("config.json") as f:
+    settings = json.load(f)
+
+
+def sloping_ground():
+    """Ground rising 1 m per 100 m eastwards from 10 m a.s.l. at x = 317 km."""
+
+    x = 317_010 + 20 * np.arange(150)
+    y = 373_010 + 20 * np.arange(150)
+    x_mesh, _ = np.meshgrid(x, y)
+
+    return GroundElevation(
+        ElevationGrid(10 + (x_mesh - 317_000) / 100, x[0], 20, y[0], 20)
+    )
+
+
+class TestGroundElevation(unittest.TestCase):
+    def setUp(self):
+        self.ground = sloping_ground()
+
+    def test_at(self):
+        x = np.array([317_500, 318_000, 319_000])
+        np.testing.assert_allclose(self.ground.at(x, 374_000), [15, 20, 30])
+
+    def test_depth_below_ground(self):
+        coordinates = np.array([[318_000, 374_000, -20], [319_000, 374_000, 470]])
+        np.testing.assert_allclose(
+            self.ground.depth_below_ground(coordinates), [0, 500]
+        )
+
+    def test_trajectory_wellhead_on_ground(self):
+        parameters = dict(settings["default_values"], Z=None)
+        trajectory_ = Trajectory3d(parameters, cache=ProfileCache(), ground=self.ground)
+        self.assertAlmostEqual(trajectory_.Z, 20)
+        x, y, _, z, _ = trajectory_.fork_r()
+        self.assertAlmostEqual(z[0], -20)
+
+        expected = Trajectory3d(
+            dict(settings["default_values"], Z=20), cache=ProfileCache()
+        ).fork_r()
+        np.testing.assert_allclose(z, expected[3])
+
+    def test_batch_wellheads_on_ground(self):
+        parameters = dict(settings["default_values"])
+        parameters["X"] = np.array([317_500, 318_000, 319_000])
+        parameters["Z"] = np.array([np.nan, np.nan, 50])
+        coordinates, _ = TrajectoryBatch(parameters, ground=self.ground).assemble()
+        np.testing.assert_allclose(coordinates[:, 0, 2], [-15, -20, -50])
+
+        del parameters["Z"]
+        coordinates, _ = TrajectoryBatch(parameters, ground=self.ground).assemble()
+        np.testing.assert_allclose(
+            self.ground.depth_below_ground(coordinates[:, 0]), 0, atol=1e-9
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
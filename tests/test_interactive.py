@@ -0,0 +1,151 @@
+import os
+import sys
+import unittest
+
+import json
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.distance import Distance
+from geofeatures.grid import ElevationGrid
+from geofeatures.surveys import WellSurveyStore
+from plots import GUI, InteractiveGUI, _declutter
+from synthetic import deviated_surveys, proposed_well, synthetic_wells
+
+with open("config.json") as f:
+    settings = json.load(f)
+parameters = settings["default_values"]
+
+
+def flat_ground():
+    return ElevationGrid(np.full((20, 20), 30.0), 317_000, 150, 373_000, 150)
+
+
+class TestInteractiveGUI(unittest.TestCase):
+    def setUp(self):
+        self.wells = synthetic_wells(40)
+        self.gui = InteractiveGUI(parameters, self.wells, flat_ground())
+        self.gui.fig.canvas.draw()
+
+    def tearDown(self):
+        plt.close(self.gui.fig)
+
+    def assert_distances(self, **custom_params):
+        well = proposed_well(**custom_params)
+        expected = Distance(self.wells, well).distance_matrix()
+        shown = {
+            name: line.get_data()
+            for name, line in self.gui.distance_lines.items()
+            if line.get_visible()
+        }
+        is_near = (
+            np.fmin.reduce(expected, axis=1, initial=np.inf) < settings["max_distance"]
+        )
+        names = self.wells["Borholunofn"].to_numpy()
+        self.assertEqual(set(shown), set(names[is_near]))
+        for name, curve in zip(names[is_near], expected[is_near]):
+            distances, z = shown[name]
+            np.testing.assert_allclose(distances, curve)
+            # Plotted at the depths of the proposed well they belong to
+            np.testing.assert_allclose(z, well[:, 2])
+
+    def test_slider_moves_trajectory_in_place(self):
+        casing, open_hole = self.gui.trajectory_2d
+        n_collections = len(self.gui.ax_3d.collections)
+        n_lines = len(self.gui.ax_3d.lines)
+
+        self.gui.sliders["az"].set_val(120)
+
+        self.assertIs(self.gui.trajectory_2d[0], casing)
+        self.assertEqual(len(self.gui.ax_3d.collections), n_collections)
+        self.assertEqual(len(self.gui.ax_3d.lines), n_lines)
+        self.assertEqual(self.gui.text_boxes["az"].text, "120")
+        # The 3D map plots y, x, z
+        y, x, z = self.gui.trajectory_3d[1].get_data_3d()
+        expected = proposed_well(az=120)[-len(x) :]
+        np.testing.assert_allclose(np.array((x, y, z)).T, expected)
+        self.assert_distances(az=120)
+
+    def test_text_box_sets_slider(self):
+        self.gui.text_boxes["kop"].set_val("650")
+        self.gui.text_boxes["kop"].stop_typing()
+        self.assertEqual(self.gui.sliders["kop"].val, 650)
+        self.assertEqual(self.gui.parameters["kop"], 650)
+        self.assert_distances(kop=650)
+
+    def test_infeasible_parameters_are_rolled_back(self):
+        r, z = self.gui.trajectory_2d[1].get_data()
+        # A slanted leg of 2500 - 500 - 20 / 0.01 = 0 m
+        self.gui.sliders["bu"].set_val(0.01)
+        self.assertTrue(self.gui.status_text.get_text())
+        np.testing.assert_allclose(self.gui.trajectory_2d[1].get_data()[1], z)
+        self.assertEqual(self.gui.parameters["bu"], parameters["bu"])
+        self.assertEqual(self.gui.sliders["bu"].val, parameters["bu"])
+        self.assertEqual(self.gui.text_boxes["bu"].text, f'{parameters["bu"]:g}')
+
+        # The next feasible change starts from the rolled back value
+        self.gui.sliders["az"].set_val(120)
+        self.assertFalse(self.gui.status_text.get_text())
+        self.assert_distances(az=120)
+
+    def test_well_starting_below_the_wellhead(self):
+        # A well next to the proposed one, surveyed from 1000 m down only
+        z = np.linspace(1000, 2000, 5)
+        xy = np.broadcast_to([parameters["X"] + 50, parameters["Y"]], (5, 2))
+        store = WellSurveyStore.from_surveys({"RN-D": np.column_stack((xy, z))})
+        gui = InteractiveGUI(parameters, store, flat_ground())
+        self.addCleanup(plt.close, gui.fig)
+
+        distances, depths = gui.distance_lines["RN-D"].get_data()
+        np.testing.assert_allclose(depths, proposed_well()[:, 2])
+        is_shown = ~np.isnan(distances)
+        self.assertTrue(is_shown.any())
+        self.assertTrue((depths[is_shown] >= 1000).all())
+
+
+class TestPlotIncumbentWells(unittest.TestCase):
+    def setUp(self):
+        self.gui = GUI()
+
+    def tearDown(self):
+        plt.close(self.gui.fig)
+
+    def test_one_artist_for_all_wells(self):
+        wells = synthetic_wells(300)
+        self.gui.plot_incumbent_wells(wells)
+        self.assertEqual(len(self.gui.ax_3d.collections), 2)
+        self.assertEqual(len(self.gui.ax_3d.lines), 0)
+        paths = self.gui.ax_3d.collections[0]._segments3d
+        self.assertEqual(len(paths), 300)
+        np.testing.assert_allclose(np.asarray(paths)[:, -1, 2], wells["MaxFDypi"])
+        # The z-axis is inverted
+        z_max, z_min = self.gui.ax_3d.get_zlim()
+        self.assertLessEqual(z_min, -20)
+        self.assertGreaterEqual(z_max, wells["MaxFDypi"].max())
+
+    def test_deviated_wells(self):
+        surveys = WellSurveyStore.from_surveys(deviated_surveys(20))
+        self.gui.plot_incumbent_wells(surveys)
+        paths = self.gui.ax_3d.collections[0]._segments3d
+        for path, well in zip(paths, surveys):
+            np.testing.assert_allclose(np.asarray(path), well[:, [1, 0, 2]])
+
+    def test_labels_are_decluttered(self):
+        wells = synthetic_wells(300)
+        self.gui.plot_incumbent_wells(wells)
+        self.assertLess(len(self.gui.ax_3d.texts), 300)
+        kept = _declutter(wells["y"], wells["x"], GUI.LABEL_SPACING)
+        cells = np.floor(wells[["y", "x"]].to_numpy() / GUI.LABEL_SPACING)
+        self.assertEqual(len(kept), len(np.unique(cells, axis=0)))
+        self.assertEqual(len(self.gui.ax_3d.texts), len(kept))
+
+
+if __name__ == "__main__":
+    unittest.main()
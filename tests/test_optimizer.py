@@ -0,0 +1,102 @@
+import os
+import sys
+import unittest
+
+from unittest import mock
+
+import json
+import numpy as np
+import pandas as pd
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures import optimizer
+from geofeatures.distance import Distance
+from geofeatures.optimizer import Optimizer, init_worker, min_distances, pareto_front
+from geofeatures.trajectory import TrajectoryBatch
+from synthetic import synthetic_wells
+
+with open("config.json") as f:
+    settings = json.load(f)
+parameters = settings["default_values"]
+
+
+def candidates(n_candidates, seed=0):
+    rng = np.random.default_rng(seed)
+    candidates = pd.DataFrame(
+        {key: np.full(n_candidates, val) for key, val in parameters.items()}
+    )
+    candidates["az"] = rng.uniform(0, 360, n_candidates)
+    candidates["kop"] = rng.uniform(300, 800, n_candidates)
+    return candidates
+
+
+class TestOptimizer(unittest.TestCase):
+    def test_pareto_front(self):
+        rng = np.random.default_rng(0)
+        clearance = rng.uniform(0, 300, 500)
+        throw = rng.uniform(0, 1000, 500)
+        front = pareto_front(clearance, throw)
+        is_front = np.zeros(500, dtype=bool)
+        is_front[front] = True
+        for j in range(500):
+            is_dominated = (
+                (clearance >= clearance[j])
+                & (throw <= throw[j])
+                & ((clearance > clearance[j]) | (throw < throw[j]))
+            ).any()
+            self.assertEqual(is_front[j], not is_dominated)
+
+    def test_pareto_front_float_noise(self):
+        clearance = np.array([100.0, 100.0 + 1e-9])
+        throw = np.array([500.0, 500.0 + 1e-9])
+        self.assertEqual(len(pareto_front(clearance, throw)), 1)
+
+    def test_sample_around(self):
+        bounds = {"az": (0, 360), "kop": (300, 800)}
+        optimizer_ = Optimizer(bounds, synthetic_wells(10), max_workers=1)
+        around = pd.DataFrame(dict(az=[10.0, 200.0], kop=[300.0, 700.0]))
+        sampled = optimizer_._sample(100, around=around, spread=0)
+        self.assertFalse(sampled.empty)
+        self.assertTrue(sampled["kop"].eq(sampled["az"].map({10: 300, 200: 700})).all())
+
+    def test_min_distances(self):
+        wells = synthetic_wells(200)
+        max_distance = settings["max_distance"]
+        init_worker(wells, max_distance)
+        coordinates, _ = TrajectoryBatch(candidates(20)).assemble()
+        min_distance, nearest_well = min_distances(coordinates)
+        with mock.patch.object(optimizer, "BLOCK_SIZE", 1):
+            min_distance_small, nearest_well_small = min_distances(coordinates)
+        np.testing.assert_allclose(min_distance_small, min_distance)
+        np.testing.assert_array_equal(nearest_well_small, nearest_well)
+
+        self.assertTrue(np.isfinite(min_distance).any())
+        for n, proposed_well in enumerate(coordinates):
+            distances = Distance(wells, proposed_well).distance_matrix()
+            per_well = np.fmin.reduce(distances, axis=1, initial=np.inf)
+            if per_well.min() > max_distance:
+                self.assertTrue(np.isnan(min_distance[n]))
+                self.assertIsNone(nearest_well[n])
+            else:
+                self.assertAlmostEqual(min_distance[n], per_well.min())
+                self.assertEqual(
+                    nearest_well[n], wells["Borholunofn"][np.argmin(per_well)]
+                )
+
+    def test_constraints(self):
+        bounds = {"az": (0, 360), "mmd": (1500, 3000), "bu": (0.02, 0.1)}
+        pareto = Optimizer(
+            bounds, synthetic_wells(100), max_mmd=2500, max_bu=0.06, max_workers=1
+        ).run(n_candidates=200, n_rounds=2)
+        self.assertFalse(pareto.empty)
+        self.assertTrue((pareto["mmd"] <= 2500).all())
+        self.assertTrue((pareto["bu"] <= 0.06).all())
+        self.assertTrue(np.all(np.diff(pareto["throw"]) > 0))
+        self.assertTrue(np.all(np.diff(pareto["clearance"]) > 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
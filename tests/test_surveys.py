@@ -0,0 +1,142 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.anticollision import ClosestApproach
+from geofeatures.distance import Distance, incumbent_stations
+from geofeatures.spatial import WellIndex
+from geofeatures.surveys import WellSurveyStore
+from synthetic import deviated_surveys, proposed_well, synthetic_wells
+
+
+class TestWellSurveyStore(unittest.TestCase):
+    def setUp(self):
+        self.surveys = deviated_surveys()
+        self.store = WellSurveyStore.from_surveys(self.surveys)
+
+    def test_slicing(self):
+        self.assertEqual(len(self.store), 50)
+        self.assertEqual(len(self.store.stations), sum(map(len, self.surveys.values())))
+        np.testing.assert_array_equal(self.store.well("RN-7"), self.surveys["RN-7"])
+        np.testing.assert_array_equal(self.store.well(7), self.surveys["RN-7"])
+
+        stations = self.store.depth_slice("RN-7", 800, 1200)
+        z = self.surveys["RN-7"][:, 2]
+        self.assertLessEqual(stations[0, 2], 800)
+        self.assertGreaterEqual(stations[-1, 2], min(1200, z[-1]))
+        self.assertEqual(
+            np.sum((z > 800) & (z < 1200)),
+            np.sum((stations[:, 2] > 800) & (stations[:, 2] < 1200)),
+        )
+
+    def test_padded(self):
+        xy, z = self.store.padded(np.array([3, 8]))
+        self.assertEqual(xy.shape[1], max(len(self.surveys[f"RN-{j}"]) for j in (3, 8)))
+        for row, j in enumerate((3, 8)):
+            stations = self.surveys[f"RN-{j}"]
+            np.testing.assert_array_equal(z[row, : len(stations)], stations[:, 2])
+            padding = xy[row, len(stations) :]
+            np.testing.assert_array_equal(
+                padding, np.broadcast_to(stations[-1, :2], padding.shape)
+            )
+
+    def test_no_stations(self):
+        with self.assertRaises(ValueError):
+            WellSurveyStore.from_surveys({"RN-1": np.empty((0, 3))})
+
+        store = WellSurveyStore(
+            self.store.stations, np.array([0, 0, 2]), np.array(["RN-1", "RN-2"])
+        )
+        with self.assertRaises(ValueError):
+            store.padded()
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.store.save(folder)
+            loaded = WellSurveyStore.load(folder)
+            self.assertIsInstance(loaded.stations, np.memmap)
+            np.testing.assert_array_equal(loaded.well("RN-42"), self.surveys["RN-42"])
+            np.testing.assert_array_equal(loaded.names, self.store.names)
+            del loaded
+
+    def test_vertical_wells(self):
+        wells = synthetic_wells(20)
+        store = WellSurveyStore.from_wells(wells)
+        for expected, actual in zip(incumbent_stations(wells), store.padded()):
+            np.testing.assert_array_equal(expected, actual)
+        well = proposed_well()
+        self.assertEqual(Distance(store, well).run(), Distance(wells, well).run())
+
+    def test_distance(self):
+        well = proposed_well()
+        distances = Distance(self.store, well).run()
+        for name, stations in self.surveys.items():
+            z = well[:, 2]
+            is_overlapping = (z >= stations[0, 2]) & (z <= stations[-1, 2])
+            if not is_overlapping.any():
+                self.assertNotIn(name, distances)
+                continue
+            x = np.interp(z[is_overlapping], stations[:, 2], stations[:, 0])
+            y = np.interp(z[is_overlapping], stations[:, 2], stations[:, 1])
+            np.testing.assert_allclose(
+                distances[name],
+                np.hypot(x - well[is_overlapping, 0], y - well[is_overlapping, 1]),
+            )
+
+        index = WellIndex(self.store)
+        pruned = Distance(self.store, well, index=index, max_distance=300).run()
+        for name, curve in distances.items():
+            if min(curve) <= 300:
+                np.testing.assert_allclose(pruned[name], curve)
+
+    def test_distance_pads_in_blocks(self):
+        well = proposed_well()
+        expected = Distance(self.store, well).run()
+
+        distance = Distance(self.store, well)
+        distance.BLOCK_STATIONS = 500
+        padded = WellSurveyStore.padded
+        with mock.patch.object(
+            WellSurveyStore, "padded", autospec=True, side_effect=padded
+        ) as spy:
+            distances = distance.run()
+            for call in spy.call_args_list:
+                rows = call.args[1]
+                lengths = self.store.lengths[rows]
+                # Within budget, unless one well is longer on its own
+                self.assertLessEqual(len(rows) * lengths.max(), max(500, lengths.max()))
+            self.assertGreater(spy.call_count, 1)
+        self.assertEqual(distances.keys(), expected.keys())
+        for name, curve in expected.items():
+            np.testing.assert_allclose(distances[name], curve)
+
+        moved = proposed_well(az=120)
+        distance.update(moved)
+        np.testing.assert_allclose(
+            distance.distances, Distance(self.store, moved).distance_matrix()
+        )
+
+    def test_closest_approach(self):
+        approach = ClosestApproach.from_surveys(self.store)
+        expected = ClosestApproach(self.surveys).run(proposed_well())
+        actual = approach.run(proposed_well())
+        np.testing.assert_allclose(actual["distance"], expected["distance"])
+
+    def test_closest_approach_duplicate_names(self):
+        store = WellSurveyStore(
+            self.store.stations, self.store.offsets[:3], np.array(["RN-1", "RN-1"])
+        )
+        with self.assertRaises(ValueError):
+            ClosestApproach.from_surveys(store)
+
+
+if __name__ == "__main__":
+    unittest.main()
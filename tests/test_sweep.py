@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.sweep import Sweep
+from synthetic import synthetic_wells
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestSweep(unittest.TestCase):
+    def test_grid(self):
+        sweep_ = Sweep({"az": (0, 90, 4), "dip": [10, 20]}, synthetic_wells(10), "")
+        runs = sweep_.runs(0, len(sweep_))
+        self.assertEqual(len(sweep_), 8)
+        self.assertEqual(
+            set(zip(runs["az"], runs["dip"])),
+            {(az, dip) for az in (0, 30, 60, 90) for dip in (10, 20)},
+        )
+        np.testing.assert_array_equal(sweep_.runs(3, 6)["run"], [3, 4, 5])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            sweep_ = Sweep(
+                {"az": (0, 350, 36), "kop": [400, 600]}, synthetic_wells(50), output_dir
+            )
+            filenames = sweep_.run(chunk_size=25, max_workers=2)
+            self.assertEqual(len(filenames), 3)
+            self.assertEqual(sweep_.run(chunk_size=25, max_workers=2), [])
+
+            results = pd.read_parquet(output_dir)
+            self.assertEqual(sorted(results["run"]), list(range(72)))
+            self.assertTrue(results["nearest_well"].notna().any())
+            is_near = results["min_distance"].notna()
+            np.testing.assert_array_equal(is_near, results["nearest_well"].notna())
+            self.assertTrue(
+                (results["min_distance"][is_near] <= sweep_.max_distance).all()
+            )
+            no_of_stations = 2 * 50 + results["dip"] - 1
+            np.testing.assert_array_equal(results["x"].map(len), no_of_stations)
+            np.testing.assert_array_equal(results["z"].map(len), no_of_stations)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_infeasible_runs(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            sweep_ = Sweep({"dip": [1, 10, 20]}, synthetic_wells(10), output_dir)
+            sweep_.run(chunk_size=1, max_workers=1)
+            results = pd.read_parquet(output_dir)
+            self.assertEqual(list(results["run"]), [1, 2])
+            self.assertEqual(len(os.listdir(output_dir)), 4)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_resume_only_same_sweep(self):
+        wells = synthetic_wells(20)
+        with tempfile.TemporaryDirectory() as output_dir:
+            sweep_ = Sweep({"az": (0, 90, 4)}, wells, output_dir)
+            sweep_.run(chunk_size=2, max_workers=1)
+            with self.assertRaises(ValueError):
+                sweep_.run(chunk_size=3, max_workers=1)
+            with self.assertRaises(ValueError):
+                Sweep({"az": (0, 180, 4)}, wells, output_dir).run(
+                    chunk_size=2, max_workers=1
+                )
+            self.assertEqual(sweep_.run(chunk_size=2, max_workers=1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import unittest
+
+import json
+import numpy as np
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.trajectory import (
+    ProfileCache,
+    Trajectory3d,
+    TrajectoryBatch,
+    is_feasible,
+)
+
+with open("config.json") as f:
+    settings = json.load(f)
+parameters = settings["default_values"]
+
+
+class TestForkR(unittest.TestCase):
+    def test_cardinal_azimuths(self):
+        trajectory_ = Trajectory3d(parameters)
+        throw = trajectory_.r[-1]
+        expected = {0: (0, 1), 90: (1, 0), 180: (0, -1), 270: (-1, 0)}
+        for az, (east, north) in expected.items():
+            x, y, _, _, _ = trajectory_.fork_r(az)
+            self.assertAlmostEqual(x[-1] - parameters["X"], east * throw, places=6)
+            self.assertAlmostEqual(y[-1] - parameters["Y"], north * throw, places=6)
+
+    def test_azimuth_grid(self):
+        trajectory_ = Trajectory3d(parameters)
+        azimuths = np.arange(0, 360, 15)
+        x, y, r, _, _ = trajectory_.fork_r(azimuths)
+        self.assertEqual(x.shape, (len(azimuths), len(r)))
+        self.assertEqual(y.shape, (len(azimuths), len(r)))
+        for row, az in enumerate(azimuths):
+            x_single, y_single, _, _, _ = trajectory_.fork_r(az)
+            np.testing.assert_allclose(x[row], x_single)
+            np.testing.assert_allclose(y[row], y_single)
+        # Horizontal throw is preserved regardless of azimuth
+        throw = np.hypot(x - parameters["X"], y - parameters["Y"])
+        np.testing.assert_allclose(throw, np.broadcast_to(r, throw.shape), atol=1e-6)
+
+
+class TestProfileCache(unittest.TestCase):
+    def test_reuse_and_eviction(self):
+        cache = ProfileCache(maxsize=2)
+        first = Trajectory3d(parameters, cache=cache)
+        # Azimuth and wellhead don't affect the profile
+        rotated = Trajectory3d(dict(parameters, az=120, X=319_000), cache=cache)
+        self.assertIs(rotated.r, first.r)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertFalse(first.r.flags.writeable)
+
+        Trajectory3d(dict(parameters, kop=600), cache=cache)
+        Trajectory3d(dict(parameters, kop=700), cache=cache)
+        self.assertEqual(len(cache.profiles), 2)
+        Trajectory3d(parameters, cache=cache)  # Evicted as least recently used
+        self.assertEqual(cache.misses, 4)
+
+        uncached = Trajectory3d(
+            dict(parameters, az=120, X=319_000), cache=ProfileCache()
+        )
+        np.testing.assert_array_equal(rotated.fork_r()[0], uncached.fork_r()[0])
+
+
+class TestTrajectoryBatch(unittest.TestCase):
+    def test_matches_single_wells(self):
+        rng = np.random.default_rng(0)
+        n_wells = 50
+        batch_parameters = {
+            key: np.full(n_wells, val) for key, val in parameters.items()
+        }
+        batch_parameters["dip"] = rng.integers(5, 45, n_wells)
+        batch_parameters["az"] = rng.uniform(0, 360, n_wells)
+        batch_parameters["cd"] = rng.uniform(100, 2000, n_wells)
+        batch_parameters["kop"] = rng.uniform(100, 800, n_wells)
+        batch_parameters["bu"] = rng.uniform(0.03, 0.1, n_wells)
+
+        coordinates, casing_split_indices = TrajectoryBatch(batch_parameters).assemble()
+        no_of_stations_max = 100 + batch_parameters["dip"].max() - 1
+        self.assertEqual(coordinates.shape, (n_wells, no_of_stations_max, 3))
+
+        for n in range(n_wells):
+            single_parameters = {key: val[n] for key, val in batch_parameters.items()}
+            single_parameters["dip"] = int(single_parameters["dip"])
+            x, y, _, z, casing_split_index = Trajectory3d(single_parameters).fork_r()
+            no_of_stations = len(z)
+            np.testing.assert_allclose(
+                coordinates[n, :no_of_stations], np.stack((x, y, z), axis=-1)
+            )
+            # Padding repeats the last station
+            np.testing.assert_array_equal(
+                coordinates[n, no_of_stations:],
+                np.broadcast_to(
+                    coordinates[n, no_of_stations - 1],
+                    coordinates[n, no_of_stations:].shape,
+                ),
+            )
+            self.assertEqual(casing_split_indices[n], casing_split_index)
+
+
+class TestIsFeasible(unittest.TestCase):
+    def test_legs(self):
+        self.assertTrue(is_feasible(parameters))
+        self.assertFalse(is_feasible(dict(parameters, dip=1)))
+        self.assertFalse(is_feasible(dict(parameters, bu=0)))
+        self.assertFalse(is_feasible(dict(parameters, kop=parameters["mmd"])))
+        self.assertFalse(is_feasible(parameters, max_mmd=parameters["mmd"] - 1))
+        self.assertFalse(is_feasible(parameters, max_bu=parameters["bu"] / 2))
+
+    def test_batch(self):
+        batch_parameters = {key: np.full(3, val) for key, val in parameters.items()}
+        batch_parameters["dip"] = np.array([1, 10, 20])
+        np.testing.assert_array_equal(
+            is_feasible(batch_parameters), [False, True, True]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
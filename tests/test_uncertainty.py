@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+
+import json
+import numpy as np
+import pandas as pd
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.uncertainty import SeparationFactor, station_covariances
+from synthetic import proposed_well, synthetic_wells
+
+with open("config.json") as f:
+    settings = json.load(f)
+error_model = settings["position_uncertainty"]
+
+
+def horizontal_sigma(md):
+    return np.hypot(md * np.deg2rad(error_model["inclination"]), error_model["surface"])
+
+
+class TestSeparationFactor(unittest.TestCase):
+    def test_vertical_wells(self):
+        z_top = settings["default_values"]["Z"]
+        z = np.linspace(z_top, 2000, 40)
+        proposed = np.column_stack(
+            (np.full_like(z, 318_100), np.full_like(z, 374_000), z)
+        )
+        wells = pd.DataFrame(
+            dict(Borholunofn=["RN-1"], x=[318_000], y=[374_000], MaxFDypi=[1500])
+        )
+        separation_factor = SeparationFactor(wells, proposed)
+        separation_factor.run()
+
+        is_overlapping = z <= 1500
+        md = z - z_top
+        expected = 100 / (
+            error_model["sigma"] * np.sqrt(2) * horizontal_sigma(md[is_overlapping])
+        )
+        np.testing.assert_allclose(
+            separation_factor.separation_factors[0, is_overlapping], expected
+        )
+        self.assertTrue(
+            np.isnan(separation_factor.separation_factors[0, ~is_overlapping]).all()
+        )
+
+    def test_update(self):
+        wells = synthetic_wells(30)
+        separation_factor = SeparationFactor(wells, proposed_well())
+        separation_factor.run()
+        moved = proposed_well(az=120)
+        factors = separation_factor.update(moved)
+
+        expected = SeparationFactor(wells, moved)
+        self.assertEqual(factors.keys(), expected.run().keys())
+        np.testing.assert_allclose(
+            separation_factor.separation_factors, expected.separation_factors
+        )
+
+    def test_covariances_are_symmetric_positive(self):
+        rng = np.random.default_rng(0)
+        stations = np.cumsum(rng.normal([0, 0, 30], 10, (5, 50, 3)), axis=1)
+        covariances = station_covariances(stations)
+        self.assertEqual(covariances.shape, (5, 50, 3, 3))
+        np.testing.assert_allclose(covariances, np.swapaxes(covariances, -1, -2))
+        self.assertTrue((np.linalg.eigvalsh(covariances) >= -1e-9).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# To import from other parent directory in repo
+pwd = os.getcwd()
+sys.path.insert(0, pwd)
+
+from geofeatures.wells import OpenSourceWells
+
+
+def registry(n=1000, seed=0):
+    """A stand-in for the national borehole registry."""
+
+    rng = np.random.default_rng(seed)
+    areas = rng.choice(["Reykjanes", "Svartsengi", "Krafla"], n)
+    depths = rng.uniform(100, 3000, n)
+    depths[::7] = np.nan
+
+    return pd.DataFrame(
+        {
+            "Borholunofn": [f"W-{j}" for j in range(n)],
+            "SVAEDISNAFN": areas,
+            "x": rng.uniform(300_000, 700_000, n),
+            "y": rng.uniform(300_000, 600_000, n),
+            "MaxFDypi": depths,
+            "Eigandi": "Orkustofnun",
+        }
+    )
+
+
+class TestOpenSourceWells(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.folder.name, "borholur.csv")
+        self.all_wells = registry()
+        self.all_wells.to_csv(self.source, index=False)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _wells(self):
+        return OpenSourceWells("Reykjanes", self.source, cache_dir=self.folder.name)
+
+    def test_stream(self):
+        wells = self._wells().stream(chunksize=64)
+        expected = self.all_wells[self.all_wells["SVAEDISNAFN"] == "Reykjanes"]
+        expected = expected[["Borholunofn", "x", "y", "MaxFDypi"]].dropna()
+        self.assertEqual(list(wells.columns), ["Borholunofn", "x", "y", "MaxFDypi"])
+        self.assertEqual(wells["MaxFDypi"].dtype, np.float32)
+        np.testing.assert_array_equal(wells["Borholunofn"], expected["Borholunofn"])
+        np.testing.assert_allclose(wells["x"], expected["x"])
+        np.testing.assert_allclose(wells["MaxFDypi"], expected["MaxFDypi"], rtol=1e-6)
+
+    def test_load_caches_until_source_changes(self):
+        wells = self._wells().load(chunksize=64)
+        with mock.patch.object(OpenSourceWells, "stream") as stream:
+            cached = self._wells().load()
+            stream.assert_not_called()
+        pd.testing.assert_frame_equal(cached, wells)
+
+        registry(seed=1).to_csv(self.source, index=False)
+        os.utime(self.source, ns=(0, 0))
+        reloaded = self._wells().load()
+        self.assertFalse(reloaded["Borholunofn"].equals(wells["Borholunofn"]))
+
+    def test_load_without_validators_expires(self):
+        unvalidated = dict.fromkeys(("ETag", "Last-Modified", "Content-Length"))
+        with mock.patch.object(
+            OpenSourceWells, "_source_signature", return_value=unvalidated
+        ):
+            self._wells().load()
+            with mock.patch.object(OpenSourceWells, "stream") as stream:
+                self._wells().load()
+                stream.assert_not_called()
+
+            expired = os.path.getmtime(self._wells().cache_filename) - (
+                OpenSourceWells.MAX_CACHE_AGE + 1
+            )
+            os.utime(self._wells().cache_filename, (expired, expired))
+            with mock.patch.object(
+                OpenSourceWells, "stream", return_value=self._wells().stream()
+            ) as stream:
+                self._wells().load()
+                stream.assert_called_once()
+
+    def test_load_defaults_to_local_file(self):
+        wells_filename = os.path.join(self.folder.name, "wells.csv")
+        with mock.patch.dict(
+            "geofeatures.wells.settings", wells_filename=wells_filename
+        ):
+            self._wells().save(self._wells().stream())
+            with mock.patch("geofeatures.wells.requests.head") as head:
+                wells = OpenSourceWells(cache_dir=self.folder.name).load()
+                head.assert_not_called()
+        pd.testing.assert_frame_equal(wells, self._wells().stream())
+        self.assertEqual(
+            sorted(os.listdir(self.folder.name)), ["borholur.csv", "wells.csv"]
+        )
+
+    def test_load_without_local_file(self):
+        wells_filename = os.path.join(self.folder.name, "wells.csv")
+        with mock.patch.dict(
+            "geofeatures.wells.settings", wells_filename=wells_filename
+        ):
+            with self.assertRaises(FileNotFoundError):
+                OpenSourceWells(cache_dir=self.folder.name).load()
+            # Offline without a cache
+            with mock.patch.object(
+                OpenSourceWells, "_source_signature", return_value=None
+            ), self.assertWarns(UserWarning), self.assertRaises(FileNotFoundError):
+                self._wells().load()
+
+
+if __name__ == "__main__":
+    unittest.main()